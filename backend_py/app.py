@@ -1,44 +1,89 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-from flask_sock import Sock
+import importlib
 import os
 
-app = Flask(__name__)
-CORS(app)
-sock = Sock(app)
-
-from tools.financial_assistant import init_financial_assistant
-from tools.market_indices import init_market_indices
-from tools.market_sector import init_market_sector
-from tools.compare import init_compare
-from tools.stock_search import init_stock_search
-from tools.market_news import init_market_news
-
-init_financial_assistant(app)
-init_market_indices(app, sock)
-init_market_sector(app)
-init_compare(app)
-init_stock_search(app)
-init_market_news(app)
-
-
-@app.route("/health", methods=["GET"])
-def health_check():
-    """Main health check endpoint for the unified server"""
-    return jsonify(
-        {
-            "status": "ok",
-            "service": "unified-tools-server",
-            "tools": [
-                "financial_assistant",
-                "market_indices",
-                "market_sector",
-                "compare",
-                "stock_search",
-                "market_news",
-            ],
-        }
-    )
+from tools.cache import cache_stats
+from tools.http_client import host_stats
+from tools.metrics import init_metrics
+from tools.scheduler import scheduler
+
+# Tool name -> (module, init function); modules are only imported for enabled tools
+TOOLS = {
+    "financial_assistant": ("tools.financial_assistant", "init_financial_assistant"),
+    "market_indices": ("tools.market_indices", "init_market_indices"),
+    "market_sector": ("tools.market_sector", "init_market_sector"),
+    "compare": ("tools.compare", "init_compare"),
+    "stock_search": ("tools.stock_search", "init_stock_search"),
+    "market_news": ("tools.market_news", "init_market_news"),
+}
+
+
+def enabled_tools_from_env():
+    """Tools listed in ENABLED_TOOLS (comma-separated), or all of them when unset"""
+    value = os.environ.get("ENABLED_TOOLS", "").strip()
+    if not value or value == "all":
+        return list(TOOLS)
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+def create_app(tools=None):
+    """Build the unified server with only the given tools' routes registered.
+
+    Tool modules keep pandas, NumPy and yfinance imports inside the code
+    paths that need them, so those load on a tool's first request rather
+    than at startup.
+    """
+    tools = enabled_tools_from_env() if tools is None else list(tools)
+    unknown = [name for name in tools if name not in TOOLS]
+    if unknown:
+        raise ValueError(f"Unknown tools: {', '.join(unknown)}")
+
+    app = Flask(__name__)
+    CORS(app)
+    app.config["TOOLS"] = tools
+    init_metrics(app)
+
+    for name in tools:
+        module_name, init_name = TOOLS[name]
+        init = getattr(importlib.import_module(module_name), init_name)
+        if name == "market_indices":
+            from flask_sock import Sock
+
+            init(app, Sock(app))
+        else:
+            init(app)
+
+    @app.route("/health", methods=["GET"])
+    def health_check():
+        """Main health check endpoint for the unified server"""
+        return jsonify(
+            {
+                "status": "ok",
+                "service": "unified-tools-server",
+                "tools": tools,
+            }
+        )
+
+    @app.route("/cache/stats", methods=["GET"])
+    def cache_stats_endpoint():
+        """Hit, miss and eviction counters for the shared caches"""
+        return jsonify(cache_stats())
+
+    @app.route("/upstream/stats", methods=["GET"])
+    def upstream_stats_endpoint():
+        """Per-host latency, error and retry counters for outbound HTTP calls"""
+        return jsonify(host_stats())
+
+    @app.route("/scheduler/stats", methods=["GET"])
+    def scheduler_stats_endpoint():
+        """Rate-limit tokens, queue depth, waits and rejections per upstream and priority"""
+        return jsonify(scheduler.stats())
+
+    return app
+
+
+app = create_app()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,187 @@
+"""ASGI entry point for the unified tools server.
+
+HTTP routes are the Flask app from app.py, each request running on a
+bounded thread pool. /ws/market-indices is served natively on the event
+loop, so thousands of idle dashboard sockets do not each hold a thread.
+
+    uvicorn asgi:application --host 0.0.0.0 --port 5000
+    python asgi.py
+"""
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+
+from app import app
+from tools.index_stream import IndexStreamSession
+
+ASGI_WORKER_THREADS = int(os.environ.get("ASGI_WORKER_THREADS", "64"))
+
+executor = ThreadPoolExecutor(
+    max_workers=ASGI_WORKER_THREADS, thread_name_prefix="asgi-worker"
+)
+
+
+class BoundedWsgiToAsgiInstance(WsgiToAsgiInstance):
+    """Runs each request on the shared executor rather than asgiref's single sync thread.
+
+    Only the public pieces of WsgiToAsgiInstance are used (build_environ,
+    start_response and the sync_send it sets up), so nothing depends on how
+    asgiref wraps its own run_wsgi_app.
+    """
+
+    async def run_wsgi_app(self, body):
+        await sync_to_async(self._serve, thread_sensitive=False, executor=executor)(
+            body
+        )
+
+    def _serve(self, body):
+        try:
+            environ = self.build_environ(self.scope, body)
+        except ValueError:
+            # Too many duplicate headers
+            self.sync_send(
+                {
+                    "type": "http.response.start",
+                    "status": 400,
+                    "headers": [(b"content-type", b"text/plain")],
+                }
+            )
+            self.sync_send({"type": "http.response.body", "body": b"Bad Request"})
+            return
+        started = False
+        sent = 0
+        outputs = self.wsgi_application(environ, self.start_response)
+        try:
+            for output in outputs:
+                if not started:
+                    started = True
+                    self.sync_send(self.response_start)
+                limit = self.response_content_length
+                if limit is not None:
+                    output = output[: limit - sent]
+                self.sync_send(
+                    {"type": "http.response.body", "body": output, "more_body": True}
+                )
+                sent += len(output)
+                if sent == limit:
+                    break
+        finally:
+            # Lets Flask run its teardown handlers
+            if hasattr(outputs, "close"):
+                outputs.close()
+        if not started:
+            self.sync_send(self.response_start)
+        self.sync_send({"type": "http.response.body"})
+
+
+class BoundedWsgiToAsgi(WsgiToAsgi):
+    """WsgiToAsgi that runs requests concurrently on the shared bounded executor"""
+
+    async def __call__(self, scope, receive, send):
+        await BoundedWsgiToAsgiInstance(
+            self.wsgi_application, self.duplicate_header_limit
+        )(scope, receive, send)
+
+
+http_app = BoundedWsgiToAsgi(app)
+
+
+async def market_indices_socket(scope, receive, send):
+    """Stream market indices to one client until it disconnects"""
+    message = await receive()
+    if message["type"] != "websocket.connect":
+        return
+    await send({"type": "websocket.accept"})
+
+    params = parse_qs(scope.get("query_string", b"").decode())
+    session = IndexStreamSession.from_params(
+        lambda key, default=None: params.get(key, [default])[0],
+        lambda key: params.get(key, []),
+    )
+    poked = asyncio.Event()
+
+    async def read_actions():
+        while True:
+            message = await receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            text = message.get("text")
+            if session.handle_message(text if text is not None else message["bytes"]):
+                poked.set()
+
+    reader = asyncio.ensure_future(read_actions())
+    async_broadcaster.subscribe()
+    try:
+        version = 0
+        while not reader.done():
+            update = asyncio.ensure_future(async_broadcaster.wait_for_update(version))
+            poke = asyncio.ensure_future(poked.wait())
+            await asyncio.wait(
+                [update, poke, reader], return_when=asyncio.FIRST_COMPLETED
+            )
+            poke.cancel()
+            if update.done():
+                version, data, payload = update.result()
+            else:
+                update.cancel()
+                if reader.done():
+                    break
+                data, payload = async_broadcaster.latest()
+            poked.clear()
+            frame = session.render(data, payload)
+            if frame is None:
+                continue
+            if isinstance(frame, bytes):
+                await send({"type": "websocket.send", "bytes": frame})
+            else:
+                await send({"type": "websocket.send", "text": frame})
+    except Exception as e:
+        if not reader.done():
+            print(f"WebSocket error: {str(e)}")
+    finally:
+        reader.cancel()
+        async_broadcaster.unsubscribe()
+
+
+WEBSOCKET_ROUTES = {}
+if "market_indices" in app.config["TOOLS"]:
+    from tools.market_indices import async_broadcaster
+
+    async_broadcaster.executor = executor
+    WEBSOCKET_ROUTES["/ws/market-indices"] = market_indices_socket
+
+
+async def lifespan(scope, receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            executor.shutdown(wait=False, cancel_futures=True)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "http":
+        await http_app(scope, receive, send)
+    elif scope["type"] == "websocket":
+        handler = WEBSOCKET_ROUTES.get(scope["path"])
+        if handler is None:
+            await send({"type": "websocket.close", "code": 1008})
+            return
+        await handler(scope, receive, send)
+    elif scope["type"] == "lifespan":
+        await lifespan(scope, receive, send)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    port = int(os.environ.get("PORT", 5000))
+    uvicorn.run(application, host="0.0.0.0", port=port, backlog=4096)
@@ -0,0 +1,80 @@
+"""Wall-clock comparison of the per-symbol and batched index fetch paths.
+
+Run from backend_py:
+
+    python -m benchmarks.bench_indices --runs 3
+"""
+
+import argparse
+import statistics
+import time
+
+import yfinance as yf
+
+from tools import providers
+from tools.market_indices import INDICES, INDEX_NAMES, fetch_index_data
+
+
+def fetch_index_data_per_symbol():
+    """The original fetch loop: one Ticker.info call and a 0.2s sleep per symbol"""
+    data = {}
+    for region, symbols in INDICES.items():
+        data[region] = []
+        for symbol in symbols:
+            try:
+                info = yf.Ticker(symbol).info
+                data[region].append(
+                    {
+                        "symbol": symbol,
+                        "name": INDEX_NAMES.get(symbol, info.get("shortName", symbol)),
+                        "price": info.get("regularMarketPrice", "N/A"),
+                        "change": info.get("regularMarketChangePercent", "N/A"),
+                    }
+                )
+                time.sleep(0.2)
+            except Exception:
+                data[region].append(
+                    {
+                        "symbol": symbol,
+                        "name": INDEX_NAMES.get(symbol, symbol),
+                        "price": "N/A",
+                        "change": "N/A",
+                    }
+                )
+    return data
+
+
+def time_runs(fn, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        data = fn()
+        timings.append(time.perf_counter() - start)
+    missing = sum(
+        1 for entries in data.values() for entry in entries if entry["price"] == "N/A"
+    )
+    return timings, missing
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    # Without the quote cache every batched run reaches the upstream, like the per-symbol path
+    providers.set_provider(providers.create_provider(), cache=False)
+
+    for label, fn in (
+        ("per-symbol", fetch_index_data_per_symbol),
+        ("batched", fetch_index_data),
+    ):
+        timings, missing = time_runs(fn, args.runs)
+        print(
+            f"{label:>10}: median {statistics.median(timings):.2f}s "
+            f"min {min(timings):.2f}s max {max(timings):.2f}s "
+            f"({missing} symbols N/A)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Checks that the SQLite cache computes each missing key once across processes.
+
+Several worker processes, each with several threads, ask for the same key at
+once; exactly one compute should run and every caller should get its value.
+A second check kills the lease holder mid-compute and expects another worker
+to take the lease over once it runs out. Run from backend_py:
+
+    python -m benchmarks.check_cache_lease
+    python -m benchmarks.check_cache_lease --processes 8 --threads 4
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from tools.cache import SQLiteCache
+
+
+def worker(path, results, delay, threads):
+    cache = SQLiteCache("lease_check", path, default_ttl=30, lease_seconds=5)
+
+    def compute():
+        results.put(("compute", os.getpid()))
+        time.sleep(delay)
+        return os.getpid()
+
+    values = []
+    callers = [
+        threading.Thread(
+            target=lambda: values.append(cache.get_or_compute("shared", compute))
+        )
+        for _ in range(threads)
+    ]
+    for caller in callers:
+        caller.start()
+    for caller in callers:
+        caller.join()
+    for value in values:
+        results.put(("value", value))
+
+
+def dying_holder(path, started):
+    cache = SQLiteCache("lease_check", path, lease_seconds=1)
+
+    def compute():
+        started.set()
+        os._exit(1)
+
+    cache.get_or_compute("orphaned", compute)
+
+
+def drain(results):
+    messages = []
+    while not results.empty():
+        messages.append(results.get())
+    return messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--processes", type=int, default=6)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument(
+        "--delay", type=float, default=0.5, help="seconds each compute takes"
+    )
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    path = os.path.join(tempfile.mkdtemp(prefix="lease-check-"), "cache.sqlite3")
+    failures = []
+
+    results = context.Queue()
+    workers = [
+        context.Process(target=worker, args=(path, results, args.delay, args.threads))
+        for _ in range(args.processes)
+    ]
+    start = time.perf_counter()
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+    elapsed = time.perf_counter() - start
+    messages = drain(results)
+    computes = [pid for kind, pid in messages if kind == "compute"]
+    values = {value for kind, value in messages if kind == "value"}
+    callers = sum(1 for kind, value in messages if kind == "value")
+    print(
+        f"shared key: {len(computes)} compute(s) for {callers} callers in "
+        f"{args.processes} processes, {len(values)} distinct value(s), "
+        f"{elapsed:.2f}s"
+    )
+    if len(computes) != 1 or len(values) != 1:
+        failures.append("shared key was computed more than once")
+    if callers != args.processes * args.threads:
+        failures.append("some callers got no value")
+
+    started = context.Event()
+    holder = context.Process(target=dying_holder, args=(path, started))
+    holder.start()
+    started.wait(10)
+    holder.join()
+    start = time.perf_counter()
+    cache = SQLiteCache("lease_check", path, lease_seconds=1)
+    value = cache.get_or_compute("orphaned", lambda: "recomputed")
+    waited = time.perf_counter() - start
+    print(f"orphaned lease: took over after {waited:.2f}s, value {value!r}")
+    if value != "recomputed":
+        failures.append("orphaned lease was not taken over")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
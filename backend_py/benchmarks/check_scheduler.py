@@ -0,0 +1,86 @@
+"""Checks that the upstream token bucket serves waiters by priority class.
+
+Three background, three dashboard and three interactive callers queue on an
+empty bucket in that arrival order; they should get tokens interactive
+first, then dashboard, then background, each class in arrival order. A
+second check expects a caller whose wait would exceed its limit to get
+UpstreamBusy straight away rather than at its deadline. Run from backend_py:
+
+    python -m benchmarks.check_scheduler
+"""
+
+import argparse
+import sys
+import threading
+import time
+
+from tools.scheduler import PRIORITIES, TokenBucket, UpstreamBusy
+
+
+def check_order(per_class, rate_per_second):
+    bucket = TokenBucket("order_check", rate_per_second * 60, 1)
+    bucket.acquire("interactive", 1)
+    served = []
+
+    def call(name, tag):
+        bucket.acquire(name, 30)
+        served.append(tag)
+
+    callers = []
+    for name in sorted(PRIORITIES, key=PRIORITIES.get, reverse=True):
+        for i in range(per_class):
+            caller = threading.Thread(target=call, args=(name, f"{name}-{i}"))
+            caller.start()
+            callers.append(caller)
+            # Let each caller join the queue before the next one arrives
+            while sum(bucket.queued().values()) < len(callers):
+                time.sleep(0.001)
+    for caller in callers:
+        caller.join()
+
+    expected = [
+        f"{name}-{i}"
+        for name in sorted(PRIORITIES, key=PRIORITIES.get)
+        for i in range(per_class)
+    ]
+    return served, expected
+
+
+def check_fail_fast():
+    bucket = TokenBucket("busy_check", 6, 1)
+    bucket.acquire("interactive", 1)
+    start = time.perf_counter()
+    try:
+        bucket.acquire("dashboard", 5)
+    except UpstreamBusy:
+        return time.perf_counter() - start
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--per-class", type=int, default=3)
+    parser.add_argument("--rate", type=float, default=20, help="tokens per second")
+    args = parser.parse_args()
+    failures = []
+
+    served, expected = check_order(args.per_class, args.rate)
+    print(f"served: {', '.join(served)}")
+    if served != expected:
+        failures.append(f"expected {', '.join(expected)}")
+
+    rejected_after = check_fail_fast()
+    if rejected_after is None:
+        failures.append("an over-long wait was granted instead of rejected")
+    else:
+        print(f"over-long wait rejected after {rejected_after * 1000:.1f} ms")
+        if rejected_after > 0.1:
+            failures.append("rejection waited instead of failing fast")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
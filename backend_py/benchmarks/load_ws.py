@@ -0,0 +1,160 @@
+"""Hold many /ws/market-indices sockets open and measure HTTP latency alongside them.
+
+Run against either server:
+
+    python app.py                                   # Flask + flask_sock
+    uvicorn asgi:application --port 5000            # ASGI mode
+    python -m benchmarks.load_ws --clients 2000 --requests 500 --concurrency 50
+
+Reports how many sockets connected, socket connect latency, how far apart
+the clients received the same broadcast, and p50/p95/p99 latency of HTTP
+requests issued while the sockets are open.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import websockets
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def summarize(values, scale=1000):
+    return {
+        "count": len(values),
+        "p50_ms": _ms(percentile(values, 50), scale),
+        "p95_ms": _ms(percentile(values, 95), scale),
+        "p99_ms": _ms(percentile(values, 99), scale),
+        "max_ms": _ms(max(values) if values else None, scale),
+    }
+
+
+def _ms(value, scale):
+    return None if value is None else round(value * scale, 2)
+
+
+async def hold_socket(url, connect_times, ready, received, stop):
+    start = time.perf_counter()
+    try:
+        ws = await websockets.connect(url, open_timeout=30, max_size=None)
+    except Exception:
+        return False
+    connect_times.append(time.perf_counter() - start)
+    try:
+        async with ws:
+            while not stop.is_set():
+                try:
+                    payload = await asyncio.wait_for(ws.recv(), 1)
+                except asyncio.TimeoutError:
+                    continue
+                if ready.is_set():
+                    received.setdefault(payload, []).append(time.perf_counter())
+    except websockets.ConnectionClosed:
+        pass
+    return True
+
+
+def http_load(url, total, concurrency):
+    session = requests.Session()
+    latencies, errors = [], 0
+
+    def one(_):
+        start = time.perf_counter()
+        try:
+            response = session.get(url, timeout=60)
+            ok = response.ok
+        except requests.RequestException:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for seconds, ok in pool.map(one, range(total)):
+            latencies.append(seconds)
+            errors += not ok
+    elapsed = time.perf_counter() - start
+    return {
+        **summarize(latencies),
+        "errors": errors,
+        "rps": round(total / elapsed, 1) if elapsed else None,
+    }
+
+
+async def run(args):
+    connect_times, received = [], {}
+    ready, stop = asyncio.Event(), asyncio.Event()
+
+    started = time.perf_counter()
+    sockets = []
+    for i in range(args.clients):
+        sockets.append(
+            asyncio.ensure_future(
+                hold_socket(args.ws_url, connect_times, ready, received, stop)
+            )
+        )
+        if i % 100 == 99:
+            await asyncio.sleep(0.05)
+    while len(connect_times) < args.clients and any(not s.done() for s in sockets):
+        if time.perf_counter() - started > args.connect_timeout:
+            break
+        await asyncio.sleep(0.1)
+    ready.set()
+    connected = len(connect_times)
+
+    loop = asyncio.get_running_loop()
+    http = await loop.run_in_executor(
+        None, http_load, args.http_url, args.requests, args.concurrency
+    )
+
+    deadline = time.perf_counter() + args.hold
+    while time.perf_counter() < deadline and not any(
+        len(times) >= connected for times in received.values()
+    ):
+        await asyncio.sleep(0.1)
+    stop.set()
+    await asyncio.gather(*sockets, return_exceptions=True)
+
+    # The broadcast most clients saw after the connect phase; spread is each
+    # client's receive time relative to the first one
+    times = sorted(max(received.values(), key=len, default=[]))
+    spread = [t - times[0] for t in times]
+    return {
+        "clients": args.clients,
+        "connected": connected,
+        "connect": summarize(connect_times),
+        "broadcast_received": len(times),
+        "broadcast_spread": summarize(spread),
+        "http": {"url": args.http_url, **http},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1:5000")
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--path", default="/health", help="HTTP path to time")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument(
+        "--hold", type=float, default=15, help="seconds to wait for a broadcast"
+    )
+    parser.add_argument("--connect-timeout", type=float, default=60)
+    args = parser.parse_args()
+    args.ws_url = f"ws://{args.host}/ws/market-indices"
+    args.http_url = f"http://{args.host}{args.path}"
+
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
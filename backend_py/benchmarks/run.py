@@ -0,0 +1,405 @@
+"""Reproducible benchmark for every backend endpoint against offline upstreams.
+
+Starts the app in-process with a synthetic (or replayed) market-data
+provider and the stub LLM, then drives each endpoint at a fixed concurrency
+and reports throughput, p50/p95/p99 latency and process RSS. Run from
+backend_py:
+
+    python -m benchmarks.run --output benchmarks/results/main.json
+    python -m benchmarks.run --baseline benchmarks/results/main.json
+
+With --baseline, each scenario is compared against the saved results and
+the run exits non-zero if p99 latency or throughput regressed by more than
+--threshold.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.load_ws import hold_socket, summarize
+
+SPEECH_QUERIES = [
+    "What is the current price of Apple?",
+    "How is Microsoft stock doing today?",
+    "Tell me about NVIDIA's valuation",
+    "Should I be worried about Tesla?",
+    "What moved the market today?",
+    "Give me an update on Reliance Industries",
+]
+MULTI_SPEECH_QUERIES = [
+    "Compare Apple and Microsoft",
+    "How are Reliance, TCS and Infosys doing?",
+    "Tesla vs Nvidia vs AMD today",
+    "Should I buy Google or Meta?",
+]
+SEARCH_QUERIES = ["a", "ap", "app", "appl", "m", "mi", "micro", "n", "nv", "t", "ta"]
+COMPARE_SYMBOLS = [["AAPL", "MSFT"], ["NVDA", "AMD", "TSLA"], ["GOOGL", "META"]]
+
+SCENARIOS = {
+    "speech_text": lambda i: (
+        "POST",
+        "/api/speech/text",
+        {"text": SPEECH_QUERIES[i % len(SPEECH_QUERIES)]},
+    ),
+    "speech_multi": lambda i: (
+        "POST",
+        "/api/speech/text",
+        {"text": MULTI_SPEECH_QUERIES[i % len(MULTI_SPEECH_QUERIES)]},
+    ),
+    "search_stocks": lambda i: (
+        "GET",
+        f"/api/search/stocks?query={SEARCH_QUERIES[i % len(SEARCH_QUERIES)]}",
+        None,
+    ),
+    "compare_history": lambda i: (
+        "GET",
+        "/api/compare/history?period=1y&"
+        + "&".join(f"symbols={s}" for s in COMPARE_SYMBOLS[i % len(COMPARE_SYMBOLS)]),
+        None,
+    ),
+    "compare_metrics": lambda i: (
+        "GET",
+        "/api/compare/metrics?"
+        + "&".join(f"symbols={s}" for s in COMPARE_SYMBOLS[i % len(COMPARE_SYMBOLS)]),
+        None,
+    ),
+    "sectors": lambda i: ("GET", "/api/sectors", None),
+    "market_news": lambda i: ("GET", "/market-news", None),
+}
+ALL_SCENARIOS = list(SCENARIOS) + ["ws_fanout"]
+
+
+def rss_mb():
+    """Current resident set size of this process in MiB"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def configure(args):
+    """Point every upstream at offline stand-ins before the app is imported"""
+    os.environ["BAR_STORE_DIR"] = tempfile.mkdtemp(prefix="bench-bars-")
+    os.environ.pop("ANSWER_CACHE_PATH", None)
+    os.environ["CACHE_BACKEND"] = args.cache
+    # The stub LLM has no quota; a high limit keeps the bucket in the path without pacing it
+    os.environ["GROQ_RATE_PER_MINUTE"] = "1000000"
+    if args.cache == "sqlite":
+        os.environ["CACHE_PATH"] = os.path.join(
+            tempfile.mkdtemp(prefix="bench-cache-"), "cache.sqlite3"
+        )
+
+    from benchmarks.stub_llm import start_stub_llm
+    from tools import financial_assistant, market_indices, providers
+
+    if args.ws_interval < market_indices.CLIENT_POLL_SECONDS:
+        # Shorter windows end before the socket threads deliver anything
+        raise SystemExit(
+            f"--ws-interval must be at least {market_indices.CLIENT_POLL_SECONDS}s "
+            "(the socket threads' poll interval)"
+        )
+
+    if args.provider == "replay":
+        upstream = providers.ReplayProvider(
+            args.data_dir, latency=args.latency, strict=args.strict_replay
+        )
+    else:
+        from benchmarks.synthetic import SyntheticProvider
+
+        upstream = SyntheticProvider(latency=args.latency)
+    providers.set_provider(upstream)
+
+    llm = start_stub_llm(
+        token_delay=args.llm_token_delay, response_delay=args.llm_delay
+    )
+    financial_assistant.GROQ_API_URL = (
+        f"http://127.0.0.1:{llm.server_port}/openai/v1/chat/completions"
+    )
+    # Synthetic quotes do not move and unchanged data is never re-broadcast,
+    # so nudge prices on every poll to give the fan-out scenario broadcasts
+    ticks = itertools.count(1)
+
+    def moving_index_data():
+        data = market_indices.fetch_index_data()
+        tick = next(ticks)
+        for entries in data.values():
+            for entry in entries:
+                if isinstance(entry["price"], float):
+                    entry["price"] = round(entry["price"] + tick / 100, 2)
+        return data
+
+    for broadcaster in (market_indices.broadcaster, market_indices.async_broadcaster):
+        broadcaster.fetch = moving_index_data
+        broadcaster.interval = args.ws_interval
+
+
+def start_server(kind):
+    """Serve the app on a background thread and return its base host:port"""
+    port = free_port()
+    if kind == "asgi":
+        import uvicorn
+
+        import asgi
+
+        server = uvicorn.Server(
+            uvicorn.Config(
+                asgi.application,
+                host="127.0.0.1",
+                port=port,
+                log_level="warning",
+                backlog=4096,
+            )
+        )
+        threading.Thread(target=server.run, daemon=True).start()
+        while not server.started:
+            time.sleep(0.05)
+    else:
+        from werkzeug.serving import make_server
+
+        from app import app
+
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)
+        server = make_server("127.0.0.1", port, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"127.0.0.1:{port}"
+
+
+def run_http(host, name, total, warmup, concurrency):
+    make_request = SCENARIOS[name]
+    local = threading.local()
+    counter = itertools.count()
+
+    def one():
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        method, path, body = make_request(next(counter))
+        start = time.perf_counter()
+        try:
+            response = session.request(
+                method, f"http://{host}{path}", json=body, timeout=120
+            )
+            ok = response.ok
+        except requests.RequestException:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda _: one(), range(warmup)))
+        start = time.perf_counter()
+        results = list(pool.map(lambda _: one(), range(total)))
+        elapsed = time.perf_counter() - start
+
+    latencies = [seconds for seconds, ok in results]
+    return {
+        **summarize(latencies),
+        "errors": sum(1 for seconds, ok in results if not ok),
+        "rps": round(total / elapsed, 1),
+    }
+
+
+async def _fanout(url, clients, broadcasts, interval):
+    connect_times, received = [], {}
+    ready, stop = asyncio.Event(), asyncio.Event()
+    sockets = [
+        asyncio.ensure_future(hold_socket(url, connect_times, ready, received, stop))
+        for _ in range(clients)
+    ]
+    deadline = time.perf_counter() + 60
+    while len(connect_times) < clients and time.perf_counter() < deadline:
+        if all(s.done() for s in sockets):
+            break
+        await asyncio.sleep(0.05)
+    ready.set()
+    await asyncio.sleep(interval * broadcasts + interval / 2)
+    stop.set()
+    await asyncio.gather(*sockets, return_exceptions=True)
+
+    # Prices move on every tick and unchanged data is never re-sent, so each
+    # distinct payload is one broadcast
+    spreads = []
+    complete = 0
+    for times in received.values():
+        first = min(times)
+        spreads.extend(t - first for t in times)
+        complete += len(times) >= len(connect_times)
+    return {
+        "clients": clients,
+        "connected": len(connect_times),
+        "connect": summarize(connect_times),
+        "broadcasts": len(received),
+        "broadcasts_reaching_all": complete,
+        "delivery_spread": summarize(spreads),
+    }
+
+
+def run_fanout(host, clients, broadcasts, interval):
+    return asyncio.run(
+        _fanout(f"ws://{host}/ws/market-indices", clients, broadcasts, interval)
+    )
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """Print per-scenario changes against a baseline; return the regressed scenarios"""
+    regressions = []
+    print(
+        f"\n{'scenario':<18}{'metric':<8}{'baseline':>12}{'current':>12}{'change':>10}"
+    )
+    for name, current in results["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        if name == "ws_fanout":
+            pairs = [("p99", before["delivery_spread"], current["delivery_spread"])]
+        else:
+            pairs = [("p99", before, current), ("rps", before, current)]
+        for metric, old, new in pairs:
+            key = "rps" if metric == "rps" else "p99_ms"
+            if not old.get(key) or new.get(key) is None:
+                continue
+            change = (new[key] - old[key]) / old[key]
+            worse = change < -threshold if metric == "rps" else change > threshold
+            if worse:
+                regressions.append(f"{name} {metric}")
+            print(
+                f"{name:<18}{metric:<8}{old[key]:>12}{new[key]:>12}"
+                f"{change:>+9.0%}{' !' if worse else ''}"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--scenarios",
+        default=",".join(ALL_SCENARIOS),
+        help=f"comma-separated subset of {', '.join(ALL_SCENARIOS)}",
+    )
+    parser.add_argument("--server", choices=["wsgi", "asgi"], default="wsgi")
+    parser.add_argument(
+        "--provider", choices=["synthetic", "replay"], default="synthetic"
+    )
+    parser.add_argument("--data-dir", default="recordings", help="replay captures")
+    parser.add_argument(
+        "--strict-replay",
+        action="store_true",
+        help="fail on calls whose exact dates were never captured",
+    )
+    parser.add_argument("--cache", choices=["memory", "sqlite"], default="memory")
+    parser.add_argument(
+        "--latency", type=float, default=0.05, help="simulated upstream seconds"
+    )
+    parser.add_argument("--llm-delay", type=float, default=0.2)
+    parser.add_argument("--llm-token-delay", type=float, default=0.0)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--ws-clients", type=int, default=500)
+    parser.add_argument("--ws-broadcasts", type=int, default=3)
+    parser.add_argument("--ws-interval", type=float, default=1.0)
+    parser.add_argument("--output", help="write JSON results here")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args()
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(scenarios) - set(ALL_SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    configure(args)
+    start_rss = rss_mb()
+    host = start_server(args.server)
+
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "server": args.server,
+            "provider": args.provider,
+            "cache": args.cache,
+            "latency": args.latency,
+            "llm_delay": args.llm_delay,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "rss_mb_at_start": start_rss,
+        },
+        "scenarios": {},
+    }
+
+    for name in scenarios:
+        if name == "ws_fanout":
+            result = run_fanout(
+                host, args.ws_clients, args.ws_broadcasts, args.ws_interval
+            )
+            summary = (
+                f"{result['connected']}/{result['clients']} connected, "
+                f"spread p99 {result['delivery_spread']['p99_ms']} ms"
+            )
+        else:
+            result = run_http(host, name, args.requests, args.warmup, args.concurrency)
+            summary = (
+                f"{result['rps']} req/s, p50 {result['p50_ms']} ms, "
+                f"p99 {result['p99_ms']} ms, {result['errors']} errors"
+            )
+        result["rss_mb"] = rss_mb()
+        results["scenarios"][name] = result
+        print(f"{name:<18}{summary}, rss {result['rss_mb']} MiB")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"\nRegressed beyond {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Startup time and resident memory of the app for different ENABLED_TOOLS sets.
+
+Each configuration is imported in a fresh interpreter, so nothing is
+shared between runs. Run from backend_py:
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --configs all market_news financial_assistant
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from app import TOOLS
+
+HEAVY_MODULES = ("numpy", "pandas", "yfinance", "bs4", "requests", "msgpack")
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app
+elapsed = time.perf_counter() - start
+rss = None
+with open("/proc/self/status") as f:
+    for line in f:
+        if line.startswith("VmRSS:"):
+            rss = int(line.split()[1]) / 1024
+print(json.dumps({
+    "seconds": elapsed,
+    "rss_mb": rss,
+    "modules": len(sys.modules),
+    "heavy": [m for m in %r if m in sys.modules],
+}))
+""" % (HEAVY_MODULES,)
+
+
+def probe(tools):
+    env = dict(os.environ, ENABLED_TOOLS=tools)
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--configs",
+        nargs="+",
+        default=["all"] + list(TOOLS),
+        help="ENABLED_TOOLS values to measure, e.g. all or market_news,stock_search",
+    )
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="print JSON only")
+    args = parser.parse_args()
+
+    report = {}
+    for config in args.configs:
+        samples = [probe(config) for _ in range(args.runs)]
+        report[config] = {
+            "startup_ms": round(
+                statistics.median(s["seconds"] for s in samples) * 1000, 1
+            ),
+            "rss_mb": round(statistics.median(s["rss_mb"] for s in samples), 1),
+            "modules": samples[-1]["modules"],
+            "heavy_modules": samples[-1]["heavy"],
+        }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(
+        f"{'ENABLED_TOOLS':<38}{'startup ms':>12}{'RSS MiB':>10}{'modules':>9}  heavy"
+    )
+    for config, row in report.items():
+        print(
+            f"{config:<38}{row['startup_ms']:>12}{row['rss_mb']:>10}"
+            f"{row['modules']:>9}  {', '.join(row['heavy_modules']) or '-'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
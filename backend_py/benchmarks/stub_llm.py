@@ -0,0 +1,125 @@
+"""Local stand-in for the Groq chat-completions API.
+
+Answers both plain and `stream: true` requests with a canned reply, sending
+OpenAI-style `chat.completion.chunk` events one token at a time. Point the
+backend at it with:
+
+    python -m benchmarks.stub_llm --port 8089 --token-delay 0.02
+    GROQ_API_URL=http://127.0.0.1:8089/openai/v1/chat/completions python app.py
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPLY = (
+    "**Apple Inc.** (AAPL) is trading at $189.25 USD, up (+1.35%) on the day. "
+    "The stock moved between $186.10 and $190.02 on solid volume. "
+    "With a P/E ratio near 29, the valuation remains above the sector average.\n"
+    "Overall, momentum is positive but watch the $190 resistance level."
+)
+
+
+def tokenize(text):
+    """Split text into small word-and-space pieces, like an LLM token stream"""
+    tokens = []
+    word = ""
+    for char in text:
+        word += char
+        if char in " \n":
+            tokens.append(word)
+            word = ""
+    if word:
+        tokens.append(word)
+    return tokens
+
+
+def make_handler(reply, token_delay, response_delay):
+    class StubLLMHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.0"
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            time.sleep(response_delay)
+
+            if not body.get("stream"):
+                payload = json.dumps(
+                    {
+                        "object": "chat.completion",
+                        "model": body.get("model"),
+                        "choices": [
+                            {
+                                "index": 0,
+                                "message": {"role": "assistant", "content": reply},
+                                "finish_reason": "stop",
+                            }
+                        ],
+                        "usage": {
+                            "prompt_tokens": sum(
+                                len(m.get("content", "")) // 4
+                                for m in body.get("messages", [])
+                            ),
+                            "completion_tokens": len(tokenize(reply)),
+                        },
+                    }
+                ).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            for token in tokenize(reply):
+                chunk = {
+                    "object": "chat.completion.chunk",
+                    "model": body.get("model"),
+                    "choices": [{"index": 0, "delta": {"content": token}}],
+                }
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+                time.sleep(token_delay)
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+
+    return StubLLMHandler
+
+
+def start_stub_llm(port=0, reply=REPLY, token_delay=0.02, response_delay=0.0):
+    """Start the stub on a background thread and return the server (port 0 picks one)"""
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", port), make_handler(reply, token_delay, response_delay)
+    )
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    parser.add_argument("--response-delay", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", args.port),
+        make_handler(REPLY, args.token_delay, args.response_delay),
+    )
+    print(
+        f"Stub LLM listening on http://127.0.0.1:{args.port}/openai/v1/chat/completions"
+    )
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
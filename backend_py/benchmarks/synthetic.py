@@ -0,0 +1,193 @@
+"""Deterministic offline market data for benchmarks.
+
+Every symbol gets its own seeded random walk, so repeated runs see the same
+prices, and every call can sleep for `latency` seconds to stand in for the
+upstream round trip.
+"""
+
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+from tools.providers import MarketDataProvider
+
+HISTORY_DAYS = 3000
+MARKET_TZ = "America/New_York"
+SEARCH_UNIVERSE = [
+    ("AAPL", "Apple Inc."),
+    ("AMZN", "Amazon.com, Inc."),
+    ("AMD", "Advanced Micro Devices, Inc."),
+    ("GOOGL", "Alphabet Inc."),
+    ("META", "Meta Platforms, Inc."),
+    ("MSFT", "Microsoft Corporation"),
+    ("NFLX", "Netflix, Inc."),
+    ("NVDA", "NVIDIA Corporation"),
+    ("TSLA", "Tesla, Inc."),
+    ("RELIANCE.NS", "Reliance Industries Limited"),
+    ("TCS.NS", "Tata Consultancy Services Limited"),
+    ("INFY.NS", "Infosys Limited"),
+]
+
+
+def _seed(symbol):
+    return zlib.crc32(symbol.encode())
+
+
+def _market_time(value):
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is None:
+        return ts.tz_localize(MARKET_TZ)
+    return ts.tz_convert(MARKET_TZ)
+
+
+class SyntheticProvider(MarketDataProvider):
+    """Random-walk OHLCV, quote, info, search and news data for any symbol"""
+
+    def __init__(self, latency=0.0, now=None):
+        self.latency = latency
+        self.now = pd.Timestamp(now or datetime.now(timezone.utc)).tz_convert(MARKET_TZ)
+        self._daily = {}
+
+    def _sleep(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _daily_bars(self, symbol):
+        bars = self._daily.get(symbol)
+        if bars is None:
+            rng = np.random.default_rng(_seed(symbol))
+            index = pd.bdate_range(
+                end=self.now.normalize().tz_localize(None), periods=HISTORY_DAYS
+            ).tz_localize(MARKET_TZ)
+            close = (20 + _seed(symbol) % 480) * np.exp(
+                np.cumsum(rng.normal(0.0003, 0.015, len(index)))
+            )
+            open_ = close * (1 + rng.normal(0, 0.004, len(index)))
+            bars = pd.DataFrame(
+                {
+                    "Open": open_,
+                    "High": np.maximum(open_, close)
+                    * (1 + rng.random(len(index)) / 100),
+                    "Low": np.minimum(open_, close)
+                    * (1 - rng.random(len(index)) / 100),
+                    "Close": close,
+                    "Volume": rng.integers(100_000, 50_000_000, len(index)),
+                },
+                index=pd.DatetimeIndex(index, name="Date"),
+            )
+            self._daily[symbol] = bars
+        return bars
+
+    def _intraday_bars(self, symbol):
+        daily = self._daily_bars(symbol)
+        session = daily.index[-1]
+        index = pd.date_range(
+            session + timedelta(hours=9, minutes=30), periods=390, freq="min"
+        )
+        rng = np.random.default_rng(_seed(symbol) + 1)
+        open_price = float(daily["Open"].iloc[-1])
+        close = open_price * np.exp(np.cumsum(rng.normal(0, 0.0008, len(index))))
+        return pd.DataFrame(
+            {
+                "Open": np.concatenate(([open_price], close[:-1])),
+                "High": close * 1.0005,
+                "Low": close * 0.9995,
+                "Close": close,
+                "Volume": rng.integers(1_000, 200_000, len(index)),
+            },
+            index=pd.DatetimeIndex(index, name="Datetime"),
+        )
+
+    def history(self, symbol, period=None, interval="1d", start=None, end=None):
+        self._sleep()
+        if interval == "1m":
+            return self._intraday_bars(symbol)
+        bars = self._daily_bars(symbol)
+        if start is not None:
+            bars = bars[bars.index >= _market_time(start)]
+        if end is not None:
+            bars = bars[bars.index < _market_time(end)]
+        if start is None and end is None and period and period != "max":
+            if period.endswith("d") and period[:-1].isdigit():
+                bars = bars.iloc[-int(period[:-1]) :]
+            elif period == "ytd":
+                bars = bars[bars.index.year == self.now.year]
+            else:
+                months = {"mo": 1, "y": 12}
+                unit = "mo" if period.endswith("mo") else "y"
+                count = int(period[: -len(unit)])
+                cutoff = self.now - pd.DateOffset(months=count * months[unit])
+                bars = bars[bars.index >= cutoff.normalize()]
+        return bars.copy()
+
+    def info(self, symbol):
+        self._sleep()
+        bars = self._daily_bars(symbol)
+        close = float(bars["Close"].iloc[-1])
+        year = bars["Close"].iloc[-252:]
+        return {
+            "shortName": f"{symbol} Inc.",
+            "longName": f"{symbol} Incorporated",
+            "currency": "USD",
+            "marketCap": int(close * (1 + _seed(symbol) % 100) * 1e8),
+            "trailingPE": round(10 + _seed(symbol) % 40 + 0.5, 2),
+            "dividendYield": round((_seed(symbol) % 30) / 1000, 4),
+            "fiftyTwoWeekHigh": float(year.max()),
+            "fiftyTwoWeekLow": float(year.min()),
+            "sector": "Technology",
+            "industry": "Software",
+            "beta": round(0.5 + (_seed(symbol) % 100) / 100, 2),
+        }
+
+    def search(self, query, quotes_count=8):
+        self._sleep()
+        needle = query.strip().lower()
+        quotes = [
+            {
+                "symbol": symbol,
+                "shortname": name,
+                "quoteType": "EQUITY",
+                "exchange": "NSI" if symbol.endswith(".NS") else "NMS",
+            }
+            for symbol, name in SEARCH_UNIVERSE
+            if symbol.lower().startswith(needle) or needle in name.lower()
+        ]
+        return {"quotes": quotes[:quotes_count]}
+
+    def news(self, topics="finance", limit=None):
+        self._sleep()
+        rng = np.random.default_rng(_seed(topics))
+        feed = []
+        for i in range(limit or 50):
+            symbol = SEARCH_UNIVERSE[i % len(SEARCH_UNIVERSE)][0]
+            published = self.now - timedelta(minutes=17 * i)
+            score = round(float(rng.normal(0, 0.3)), 4)
+            feed.append(
+                {
+                    "title": f"{symbol} headline {i}",
+                    "summary": f"Synthetic article {i} about {symbol}.",
+                    "url": f"https://news.example.com/{topics}/{i}",
+                    "banner_image": None,
+                    "source": ["Reuters", "Bloomberg", "Benzinga"][i % 3],
+                    "time_published": published.tz_convert("UTC").strftime(
+                        "%Y%m%dT%H%M%S"
+                    ),
+                    "topics": [
+                        {"topic": "Financial Markets", "relevance_score": "0.8"}
+                    ],
+                    "overall_sentiment_score": score,
+                    "overall_sentiment_label": "Neutral",
+                    "ticker_sentiment": [
+                        {
+                            "ticker": symbol,
+                            "relevance_score": "0.6",
+                            "ticker_sentiment_score": str(score),
+                            "ticker_sentiment_label": "Neutral",
+                        }
+                    ],
+                }
+            )
+        return {"feed": feed}
@@ -0,0 +1,129 @@
+import atexit
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+from tools.cache import create_cache
+
+ANSWER_CACHE_TTL = int(os.environ.get("ANSWER_CACHE_TTL", "900"))
+ANSWER_CACHE_BUCKET_SECONDS = int(os.environ.get("ANSWER_CACHE_BUCKET_SECONDS", "300"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.environ.get("ANSWER_CACHE_MAX_ENTRIES", "2048"))
+ANSWER_CACHE_PATH = os.environ.get("ANSWER_CACHE_PATH")
+
+# Fields that change the substance of an answer; updated_at is deliberately left out
+FINGERPRINT_FIELDS = (
+    "ticker",
+    "current_price",
+    "change",
+    "change_percent",
+    "day_high",
+    "day_low",
+    "market_cap",
+    "pe_ratio",
+)
+
+
+def normalize_query(query):
+    """Lowercase, drop punctuation that does not change meaning and collapse whitespace"""
+    query = query.lower().replace("’", "'")
+    query = re.sub(r"[^\w\s$%.'&-]", " ", query)
+    query = re.sub(r"(?<!\d)\.|\.(?!\d)", " ", query)
+    return " ".join(query.split())
+
+
+def fingerprint(stock_data, bucket_seconds=ANSWER_CACHE_BUCKET_SECONDS, now=None):
+    """Hash of the market data the answer was based on, scoped to a time bucket"""
+    bucket = int((now or time.time()) // bucket_seconds)
+    if not stock_data:
+        return f"none:{bucket}"
+    snapshots = stock_data if isinstance(stock_data, list) else [stock_data]
+    fields = [[str(s.get(field)) for field in FINGERPRINT_FIELDS] for s in snapshots]
+    digest = hashlib.sha1(json.dumps(fields).encode("utf-8")).hexdigest()[:16]
+    return f"{digest}:{bucket}"
+
+
+class AnswerCache:
+    """Caches LLM answers keyed on the normalized query, ticker and a market-data fingerprint.
+
+    The fingerprint includes a time bucket, so an answer is reused for a
+    repeat question only while the price it quoted is unchanged and the
+    bucket has not rolled over. With a path, entries are written to a JSON
+    file (at most every save_interval seconds and at exit) and reloaded on
+    start with their remaining TTL.
+    """
+
+    def __init__(
+        self,
+        max_entries=ANSWER_CACHE_MAX_ENTRIES,
+        ttl=ANSWER_CACHE_TTL,
+        path=ANSWER_CACHE_PATH,
+        save_interval=30,
+    ):
+        self.cache = create_cache(
+            "llm_answers", default_ttl=ttl, max_entries=max_entries
+        )
+        self.path = path
+        self.save_interval = save_interval
+        self._last_save = 0
+        self._save_lock = threading.Lock()
+        if path:
+            self.load()
+            atexit.register(self.save)
+
+    def key(self, query, ticker, stock_data):
+        raw = json.dumps([normalize_query(query), ticker, fingerprint(stock_data)])
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def get(self, query, ticker, stock_data):
+        return self.cache.get(self.key(query, ticker, stock_data))
+
+    def set(self, query, ticker, stock_data, answer):
+        self.cache.set(self.key(query, ticker, stock_data), answer)
+        self._maybe_save()
+
+    def get_or_compute(self, query, ticker, stock_data, compute):
+        """Return a cached answer or compute, cache and return one; errors are not cached"""
+        answer = self.cache.get_or_compute(self.key(query, ticker, stock_data), compute)
+        self._maybe_save()
+        return answer
+
+    def load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                entries = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        now = time.time()
+        for key, answer, expires_at in entries:
+            if expires_at > now:
+                self.cache.set(key, answer, expires_at - now)
+
+    def save(self):
+        if not self.path:
+            return
+        with self._save_lock:
+            now = time.time()
+            entries = [
+                [key, answer, now + seconds_left]
+                for key, answer, seconds_left in self.cache.items()
+            ]
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(entries, f)
+            os.replace(self.path + ".tmp", self.path)
+            self._last_save = now
+
+    def _maybe_save(self):
+        if self.path and time.time() - self._last_save > self.save_interval:
+            try:
+                self.save()
+            except OSError as e:
+                print(f"Error saving answer cache: {e}")
+
+
+answer_cache = AnswerCache()
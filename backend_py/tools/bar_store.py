@@ -0,0 +1,272 @@
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from tools.providers import get_provider
+
+BAR_STORE_DIR = os.environ.get(
+    "BAR_STORE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "bars"),
+)
+BAR_REFRESH_SECONDS = int(os.environ.get("BAR_REFRESH_SECONDS", "300"))
+
+BAR_DTYPE = np.dtype(
+    [
+        ("ts", "<i8"),
+        ("Open", "<f8"),
+        ("High", "<f8"),
+        ("Low", "<f8"),
+        ("Close", "<f8"),
+        ("Volume", "<f8"),
+    ]
+)
+PRICE_COLUMNS = ("Open", "High", "Low", "Close", "Volume")
+
+# Any "<n>d", "<n>wk", "<n>mo" or "<n>y" period yfinance accepts, e.g. 1wk from the 1W button
+CUSTOM_PERIOD = re.compile(r"([1-9]\d*)(d|wk|mo|y)")
+PERIOD_OFFSETS = {
+    "1mo": pd.DateOffset(months=1),
+    "3mo": pd.DateOffset(months=3),
+    "6mo": pd.DateOffset(months=6),
+    "1y": pd.DateOffset(years=1),
+    "2y": pd.DateOffset(years=2),
+    "5y": pd.DateOffset(years=5),
+    "10y": pd.DateOffset(years=10),
+}
+
+
+def period_start(period, now=None):
+    """Earliest timestamp (UTC) a yfinance-style period covers; None means all history"""
+    now = pd.Timestamp(now or datetime.now(timezone.utc))
+    if now.tzinfo is None:
+        now = now.tz_localize("UTC")
+    today = now.normalize()
+    if period == "max":
+        return None
+    if period == "ytd":
+        return today.replace(month=1, day=1)
+    if period in PERIOD_OFFSETS:
+        return today - PERIOD_OFFSETS[period]
+    match = CUSTOM_PERIOD.fullmatch(period or "")
+    if match is None:
+        raise ValueError(f"Unsupported period: {period}")
+    count, unit = int(match.group(1)), match.group(2)
+    if unit == "d":
+        # Trading-day periods: leave a weekend and holiday margin, trimmed by bar count later
+        return today - pd.Timedelta(days=count * 2 + 7)
+    if unit == "wk":
+        return today - pd.DateOffset(weeks=count)
+    if unit == "mo":
+        return today - pd.DateOffset(months=count)
+    return today - pd.DateOffset(years=count)
+
+
+def _to_ms(ts):
+    return int(pd.Timestamp(ts).value // 1_000_000)
+
+
+def _frame_to_bars(hist):
+    hist = hist.dropna(subset=["Close"])
+    bars = np.empty(len(hist), dtype=BAR_DTYPE)
+    index = pd.DatetimeIndex(hist.index)
+    if index.tz is None:
+        index = index.tz_localize("UTC")
+    bars["ts"] = index.tz_convert("UTC").as_unit("ms").asi8
+    for column in PRICE_COLUMNS:
+        bars[column] = hist[column].to_numpy(dtype="f8") if column in hist else np.nan
+    return bars
+
+
+def _merge(older, newer):
+    """Combine two sorted bar arrays; bars from `newer` win where timestamps overlap"""
+    if len(newer) == 0:
+        return older
+    if len(older) == 0:
+        return newer
+    head = older[older["ts"] < newer["ts"][0]]
+    tail = older[older["ts"] > newer["ts"][-1]]
+    return np.concatenate([head, newer, tail])
+
+
+def _replace_atomically(path, write, mode="wb"):
+    """Write to a uniquely named temp file beside path, then rename it over path"""
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(path), prefix=os.path.basename(path) + ".", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, mode) as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class BarStore:
+    """On-disk OHLCV store: one memory-mapped NumPy record array per symbol and interval.
+
+    Past bars never change, so after the first download a request only asks
+    the upstream for bars from the last stored session onwards (at most once
+    every BAR_REFRESH_SECONDS) and slices the requested period from disk. A
+    longer period than was ever stored triggers a one-off backfill. Updates
+    of a symbol are serialized across worker processes with a lock file.
+    """
+
+    def __init__(self, directory=BAR_STORE_DIR, refresh_seconds=BAR_REFRESH_SECONDS):
+        self.directory = directory
+        self.refresh_seconds = refresh_seconds
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def _lock_for(self, key):
+        with self._locks_lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    @contextmanager
+    def _file_lock(self, symbol, interval):
+        """Serialize updates of one symbol across worker processes (POSIX only)"""
+        if fcntl is None:
+            yield
+            return
+        bars_path, meta_path = self._paths(symbol, interval)
+        os.makedirs(os.path.dirname(bars_path), exist_ok=True)
+        with open(bars_path[: -len(".npy")] + ".lock", "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _paths(self, symbol, interval):
+        safe_symbol = "".join(c if c.isalnum() or c in "._-" else "_" for c in symbol)
+        base = os.path.join(self.directory, interval, safe_symbol)
+        return base + ".npy", base + ".json"
+
+    def load(self, symbol, interval="1d"):
+        """Return (bars, meta) as stored on disk; bars is a read-only memory map.
+
+        The meta records how many bars it was saved with. If another process
+        replaces the bars between reading the two files the counts differ,
+        and the read is retried; (None, None) means nothing consistent is
+        stored yet.
+        """
+        bars_path, meta_path = self._paths(symbol, interval)
+        for attempt in range(3):
+            try:
+                with open(meta_path) as f:
+                    meta = json.load(f)
+                bars = np.load(bars_path, mmap_mode="r")
+            except (FileNotFoundError, ValueError):
+                return None, None
+            if meta.get("bars", len(bars)) == len(bars):
+                return bars, meta
+            time.sleep(0.01)
+        return None, None
+
+    def _save(self, symbol, interval, bars, meta):
+        """Write the bars, then the meta that describes them"""
+        bars_path, meta_path = self._paths(symbol, interval)
+        os.makedirs(os.path.dirname(bars_path), exist_ok=True)
+        bars = np.ascontiguousarray(bars, dtype=BAR_DTYPE)
+        meta["bars"] = len(bars)
+        _replace_atomically(bars_path, lambda f: np.save(f, bars))
+        _replace_atomically(meta_path, lambda f: json.dump(meta, f), mode="w")
+
+    def _fetch(self, symbol, interval, **kwargs):
+        hist = get_provider().history(symbol, interval=interval, **kwargs)
+        tz = None
+        if not hist.empty and getattr(hist.index, "tz", None) is not None:
+            tz = str(hist.index.tz)
+        return _frame_to_bars(hist) if not hist.empty else np.empty(0, BAR_DTYPE), tz
+
+    def _update(self, symbol, period, interval, start):
+        bars, meta = self.load(symbol, interval)
+        now = time.time()
+        start_ms = None if start is None else _to_ms(start)
+
+        if bars is None or len(bars) == 0:
+            if start is None:
+                bars, tz = self._fetch(symbol, interval, period="max")
+            else:
+                bars, tz = self._fetch(
+                    symbol, interval, start=start.strftime("%Y-%m-%d")
+                )
+            meta = {"covered_from": start_ms, "fetched_at": now, "tz": tz}
+            self._save(symbol, interval, bars, meta)
+            return
+
+        bars = np.array(bars)
+        changed = False
+        covered_from = meta.get("covered_from")
+
+        if covered_from is not None and (start_ms is None or start_ms < covered_from):
+            if start_ms is None:
+                older, tz = self._fetch(symbol, interval, period="max")
+            else:
+                first_day = pd.Timestamp(int(bars["ts"][0]), unit="ms", tz="UTC")
+                older, tz = self._fetch(
+                    symbol,
+                    interval,
+                    start=start.strftime("%Y-%m-%d"),
+                    end=first_day.strftime("%Y-%m-%d"),
+                )
+            bars = _merge(older, bars)
+            meta["covered_from"] = start_ms
+            meta["tz"] = meta.get("tz") or tz
+            changed = True
+
+        if now - meta.get("fetched_at", 0) > self.refresh_seconds:
+            last_day = pd.Timestamp(int(bars["ts"][-1]), unit="ms", tz="UTC")
+            tz = meta.get("tz")
+            if tz:
+                last_day = last_day.tz_convert(tz)
+            newer, tz = self._fetch(
+                symbol, interval, start=last_day.strftime("%Y-%m-%d")
+            )
+            bars = _merge(bars, newer)
+            meta["fetched_at"] = now
+            meta["tz"] = meta.get("tz") or tz
+            changed = True
+
+        if changed:
+            self._save(symbol, interval, bars, meta)
+
+    def history(self, symbol, period="1mo", interval="1d"):
+        """Return bars for period as a DataFrame shaped like provider.history()"""
+        start = period_start(period)
+        with self._lock_for((symbol, interval)), self._file_lock(symbol, interval):
+            self._update(symbol, period, interval, start)
+            bars, meta = self.load(symbol, interval)
+
+        if bars is None:
+            bars = np.empty(0, BAR_DTYPE)
+        if start is not None:
+            bars = bars[bars["ts"] >= _to_ms(start)]
+        if period.endswith("d") and period[:-1].isdigit():
+            bars = bars[-int(period[:-1]) :]
+
+        index = pd.to_datetime(bars["ts"], unit="ms", utc=True)
+        if meta and meta.get("tz"):
+            index = index.tz_convert(meta["tz"])
+        hist = pd.DataFrame(
+            {column: np.asarray(bars[column]) for column in PRICE_COLUMNS},
+            index=pd.DatetimeIndex(index, name="Date"),
+        )
+        hist["Volume"] = hist["Volume"].fillna(0).astype("int64")
+        return hist
+
+
+bar_store = BarStore()
@@ -0,0 +1,531 @@
+import ast
+import os
+import pickle
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+# memory: a TTLCache per process; sqlite: one database shared by every worker on the host
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "memory").lower()
+CACHE_PATH = os.environ.get(
+    "CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "cache.sqlite3"),
+)
+CACHE_LEASE_SECONDS = float(os.environ.get("CACHE_LEASE_SECONDS", "30"))
+# Writes between sweeps of expired and over-budget rows in the sqlite backend
+CACHE_PRUNE_EVERY = 64
+
+CACHES = {}
+
+
+def estimate_size(value, _depth=0):
+    """Rough byte size of a cached value; DataFrames report their own memory usage"""
+    memory_usage = getattr(value, "memory_usage", None)
+    if callable(memory_usage):
+        try:
+            usage = memory_usage(deep=True)
+            return int(usage.sum()) if hasattr(usage, "sum") else int(usage)
+        except Exception:
+            pass
+
+    size = sys.getsizeof(value)
+    if _depth > 3:
+        return size
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += estimate_size(key, _depth + 1) + estimate_size(item, _depth + 1)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            size += estimate_size(item, _depth + 1)
+    return size
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class TTLCache:
+    """Thread-safe LRU cache with per-entry TTL, a byte budget and single-flight loads.
+
+    Entries are evicted least-recently-used first once either max_entries or
+    max_bytes is exceeded. get_or_compute() runs compute once per key no
+    matter how many threads miss at the same time; the others wait for and
+    share its result (or its exception, which is not cached).
+    """
+
+    def __init__(self, name, default_ttl=60, max_entries=1024, max_bytes=None):
+        self.name = name
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+        CACHES[name] = self
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _lookup(self, key, now):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= now:
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _remove(self, key):
+        value, expires_at, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def _store(self, key, value, ttl):
+        if key in self._entries:
+            self._remove(key)
+        size = estimate_size(value) if self.max_bytes else 0
+        ttl = self.default_ttl if ttl is None else ttl
+        self._entries[key] = (value, time.monotonic() + ttl, size)
+        self._bytes += size
+        while self._entries and (
+            len(self._entries) > self.max_entries
+            or (self.max_bytes and self._bytes > self.max_bytes)
+        ):
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._lookup(key, time.monotonic())
+            if entry is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return entry[0]
+
+    def peek(self, key, default=None):
+        """Like get() but without touching the counters or the LRU order"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                return default
+            return entry[0]
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def items(self):
+        """Live entries as (key, value, seconds_left), least recently used first"""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                (key, value, expires_at - now)
+                for key, (value, expires_at, size) in self._entries.items()
+                if expires_at > now
+            ]
+
+    def get_or_compute(self, key, compute, ttl=None):
+        """Return the cached value for key, computing it at most once across threads"""
+        return self._single_flight(key, compute, ttl, use_cache=True)
+
+    def coalesce(self, key, compute):
+        """Run compute once for concurrent callers sharing key, without caching the result"""
+        return self._single_flight(("coalesce", key), compute, None, use_cache=False)
+
+    def _single_flight(self, key, compute, ttl, use_cache):
+        with self._lock:
+            if use_cache:
+                entry = self._lookup(key, time.monotonic())
+                if entry is not None:
+                    self.hits += 1
+                    return entry[0]
+                self.misses += 1
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = compute()
+        except BaseException as e:
+            flight.error = e
+            raise
+        else:
+            if use_cache:
+                with self._lock:
+                    self._store(key, flight.value, ttl)
+            return flight.value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "coalesced": self.coalesced,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    name TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    stored_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (name, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cache_entries_age ON cache_entries (name, stored_at);
+CREATE TABLE IF NOT EXISTS cache_leases (
+    name TEXT NOT NULL,
+    key TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (name, key)
+) WITHOUT ROWID;
+"""
+
+_MISSING = object()
+_connections = threading.local()
+
+
+def _connection(path):
+    """This thread's connection to the database at path, reopened after a fork"""
+    pid = os.getpid()
+    if getattr(_connections, "pid", None) != pid:
+        _connections.pid = pid
+        _connections.by_path = {}
+    conn = _connections.by_path.get(path)
+    if conn is None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(path, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        _connections.by_path[path] = conn
+    return conn
+
+
+class SQLiteCache:
+    """Cache shared by every worker process on a host, kept in one SQLite database in WAL mode.
+
+    Same interface as TTLCache; values are pickled. get_or_compute() is
+    atomic across processes: a worker that misses takes a lease on the key
+    and computes, while workers that find the lease taken poll until the
+    value lands (or the lease runs out because its holder died, and one of
+    them takes over). Threads within a process are coalesced first, as in
+    TTLCache. Past max_entries or max_bytes, the oldest writes are evicted.
+    """
+
+    def __init__(
+        self,
+        name,
+        path=CACHE_PATH,
+        default_ttl=60,
+        max_entries=1024,
+        max_bytes=None,
+        lease_seconds=CACHE_LEASE_SECONDS,
+    ):
+        self.name = name
+        self.path = path
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.lease_seconds = lease_seconds
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+        _connection(path)
+        CACHES[name] = self
+
+    def __len__(self):
+        return (
+            self._connection()
+            .execute(
+                "SELECT count(*) FROM cache_entries WHERE name = ? AND expires_at > ?",
+                (self.name, time.time()),
+            )
+            .fetchone()[0]
+        )
+
+    def _connection(self):
+        return _connection(self.path)
+
+    def _read(self, conn, skey):
+        row = conn.execute(
+            "SELECT value FROM cache_entries WHERE name = ? AND key = ? AND expires_at > ?",
+            (self.name, skey, time.time()),
+        ).fetchone()
+        return _MISSING if row is None else pickle.loads(row[0])
+
+    def _write(self, conn, skey, value, ttl):
+        blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        ttl = self.default_ttl if ttl is None else ttl
+        conn.execute(
+            "INSERT OR REPLACE INTO cache_entries VALUES (?, ?, ?, ?, ?, ?)",
+            (self.name, skey, blob, len(blob), now, now + ttl),
+        )
+
+    def _wrote(self):
+        with self._lock:
+            self._writes += 1
+            due = self._writes % CACHE_PRUNE_EVERY == 0
+        if due:
+            self.prune()
+
+    def prune(self):
+        """Drop expired rows, then the oldest ones until the entry and byte limits hold"""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "DELETE FROM cache_entries WHERE name = ? AND expires_at <= ?",
+                (self.name, time.time()),
+            )
+            count, total = conn.execute(
+                "SELECT count(*), coalesce(sum(size), 0) FROM cache_entries WHERE name = ?",
+                (self.name,),
+            ).fetchone()
+            evict = []
+            if count > self.max_entries or (self.max_bytes and total > self.max_bytes):
+                for skey, size in conn.execute(
+                    "SELECT key, size FROM cache_entries WHERE name = ? ORDER BY stored_at",
+                    (self.name,),
+                ):
+                    if count <= self.max_entries and (
+                        not self.max_bytes or total <= self.max_bytes
+                    ):
+                        break
+                    evict.append((self.name, skey))
+                    count -= 1
+                    total -= size
+                conn.executemany(
+                    "DELETE FROM cache_entries WHERE name = ? AND key = ?", evict
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        with self._lock:
+            self.evictions += len(evict)
+
+    def get(self, key, default=None):
+        value = self._read(self._connection(), repr(key))
+        with self._lock:
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return value
+
+    def peek(self, key, default=None):
+        """Like get() but without touching the counters"""
+        value = self._read(self._connection(), repr(key))
+        return default if value is _MISSING else value
+
+    def set(self, key, value, ttl=None):
+        self._write(self._connection(), repr(key), value, ttl)
+        self._wrote()
+
+    def delete(self, key):
+        self._connection().execute(
+            "DELETE FROM cache_entries WHERE name = ? AND key = ?",
+            (self.name, repr(key)),
+        )
+
+    def clear(self):
+        self._connection().execute(
+            "DELETE FROM cache_entries WHERE name = ?", (self.name,)
+        )
+
+    def items(self):
+        """Live entries as (key, value, seconds_left), oldest write first"""
+        now = time.time()
+        rows = self._connection().execute(
+            "SELECT key, value, expires_at FROM cache_entries"
+            " WHERE name = ? AND expires_at > ? ORDER BY stored_at",
+            (self.name, now),
+        )
+        return [
+            (ast.literal_eval(skey), pickle.loads(value), expires_at - now)
+            for skey, value, expires_at in rows
+        ]
+
+    def get_or_compute(self, key, compute, ttl=None):
+        """Return the cached value for key, computing it at most once across workers"""
+        skey = repr(key)
+        value = self._read(self._connection(), skey)
+        with self._lock:
+            if value is not _MISSING:
+                self.hits += 1
+                return value
+            self.misses += 1
+        return self._single_flight(
+            skey, lambda: self._compute_leased(skey, compute, ttl)
+        )
+
+    def coalesce(self, key, compute):
+        """Run compute once for concurrent callers in this process sharing key, without caching"""
+        return self._single_flight(("coalesce", repr(key)), compute)
+
+    def _single_flight(self, flight_key, compute):
+        with self._lock:
+            flight = self._inflight.get(flight_key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[flight_key] = _Flight()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = compute()
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(flight_key, None)
+            flight.done.set()
+
+    def _compute_leased(self, skey, compute, ttl):
+        owner = f"{os.getpid()}:{threading.get_ident()}"
+        conn = self._connection()
+        delay = 0.01
+        while True:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                value = self._read(conn, skey)
+                if value is _MISSING:
+                    lease = conn.execute(
+                        "SELECT expires_at FROM cache_leases WHERE name = ? AND key = ?",
+                        (self.name, skey),
+                    ).fetchone()
+                    acquired = lease is None or lease[0] <= now
+                    if acquired:
+                        conn.execute(
+                            "INSERT OR REPLACE INTO cache_leases VALUES (?, ?, ?, ?)",
+                            (self.name, skey, owner, now + self.lease_seconds),
+                        )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            if value is not _MISSING:
+                # Another worker computed it while we waited
+                with self._lock:
+                    self.coalesced += 1
+                return value
+            if acquired:
+                break
+            time.sleep(delay)
+            delay = min(delay * 2, 0.25)
+
+        try:
+            value = compute()
+        except BaseException:
+            conn.execute(
+                "DELETE FROM cache_leases WHERE name = ? AND key = ? AND owner = ?",
+                (self.name, skey, owner),
+            )
+            raise
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._write(conn, skey, value, ttl)
+            conn.execute(
+                "DELETE FROM cache_leases WHERE name = ? AND key = ?", (self.name, skey)
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self._wrote()
+        return value
+
+    def stats(self):
+        entries, size = (
+            self._connection()
+            .execute(
+                "SELECT count(*), coalesce(sum(size), 0) FROM cache_entries"
+                " WHERE name = ? AND expires_at > ?",
+                (self.name, time.time()),
+            )
+            .fetchone()
+        )
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "bytes": size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "coalesced": self.coalesced,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+def create_cache(name, default_ttl=60, max_entries=1024, max_bytes=None):
+    """Build a cache on the backend selected by CACHE_BACKEND (memory or sqlite)"""
+    if CACHE_BACKEND == "memory":
+        return TTLCache(name, default_ttl, max_entries, max_bytes)
+    if CACHE_BACKEND == "sqlite":
+        return SQLiteCache(name, CACHE_PATH, default_ttl, max_entries, max_bytes)
+    raise ValueError(f"Unknown CACHE_BACKEND: {CACHE_BACKEND}")
+
+
+def cache_stats():
+    """Stats for every cache created in this process, keyed by cache name"""
+    return {name: cache.stats() for name, cache in CACHES.items()}
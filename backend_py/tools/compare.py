@@ -1,20 +1,151 @@
 from flask import request, jsonify
-import yfinance as yf
 from datetime import datetime, timedelta
+import concurrent.futures
+
+from tools.providers import get_provider
+
+TRADING_DAYS = 252
+MAX_ANALYTICS_SYMBOLS = 100
+
+
+def load_price_matrix(symbols, period):
+    """Daily closes for every symbol aligned on calendar date, one column per symbol.
+
+    Raises ValueError for an unsupported period before loading anything.
+    """
+    import pandas as pd
+
+    from tools.bar_store import bar_store, period_start
+
+    period_start(period)
+
+    def load(symbol):
+        try:
+            hist = bar_store.history(symbol, period=period)
+        except Exception as e:
+            print(f"Error loading history for {symbol}: {e}")
+            return symbol, None
+        closes = hist["Close"].dropna()
+        if closes.empty:
+            return symbol, None
+        index = closes.index
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        closes.index = index.normalize()
+        return symbol, closes[~closes.index.duplicated(keep="last")]
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+        series = dict(executor.map(load, symbols))
+
+    found = {symbol: closes for symbol, closes in series.items() if closes is not None}
+    if not found:
+        return pd.DataFrame(), list(series)
+    prices = pd.concat(found, axis=1).sort_index().ffill()
+    missing = [symbol for symbol, closes in series.items() if closes is None]
+    return prices, missing
+
+
+def compute_analytics(prices, benchmark=None, risk_free=0.0, correlate=None):
+    """Return, risk and correlation statistics for every column of a price matrix.
+
+    correlate restricts the correlation matrix to a subset of columns.
+    """
+    import numpy as np
+    import pandas as pd
+
+    returns = prices.pct_change(fill_method=None)
+    first = prices.bfill().iloc[0]
+    last = prices.iloc[-1]
+    observations = returns.count()
+
+    total_return = last / first - 1
+    annualized_return = (1 + total_return) ** (
+        TRADING_DAYS / observations.where(observations > 0)
+    ) - 1
+    volatility = returns.std() * np.sqrt(TRADING_DAYS)
+    sharpe = (returns.mean() * TRADING_DAYS - risk_free) / volatility.where(
+        volatility > 0
+    )
+    max_drawdown = (prices / prices.cummax() - 1).min()
+
+    if benchmark in returns:
+        benchmark_returns = returns[benchmark]
+        beta = returns.cov()[benchmark] / benchmark_returns.var()
+    else:
+        beta = pd.Series(np.nan, index=prices.columns)
+
+    table = pd.DataFrame(
+        {
+            "totalReturn": total_return,
+            "annualizedReturn": annualized_return,
+            "volatility": volatility,
+            "sharpe": sharpe,
+            "maxDrawdown": max_drawdown,
+            "beta": beta,
+            "observations": observations,
+        }
+    ).round(6)
+    table = table.astype(object).where(table.notna(), None)
+
+    if correlate is not None:
+        returns = returns[[column for column in correlate if column in returns]]
+    correlation = returns.corr().round(6)
+    correlation = correlation.astype(object).where(correlation.notna(), None)
+
+    return {
+        "metrics": table.to_dict(orient="index"),
+        "correlation": {
+            "symbols": list(correlation.columns),
+            "matrix": correlation.values.tolist(),
+        },
+    }
+
+
+def _symbol_args():
+    symbols = []
+    for value in request.args.getlist("symbols"):
+        symbols.extend(s.strip().upper() for s in value.split(",") if s.strip())
+    return list(dict.fromkeys(symbols))
 
 
 def init_compare(app):
     @app.route("/api/compare/history", methods=["GET"])
     def get_comparison_history():
+        from tools.bar_store import bar_store, period_start
+        from tools.downsample import lttb_indices
+
         symbols = request.args.getlist("symbols")
         period = request.args.get("period", "1mo")
+        response_format = request.args.get("format", "records")
+        max_points = request.args.get("max_points", type=int)
+
+        if response_format not in ("records", "columnar"):
+            return jsonify({"error": "format must be 'records' or 'columnar'"}), 400
+        try:
+            period_start(period)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
         data = {}
         for symbol in symbols:
-            ticker = yf.Ticker(symbol)
-            hist = ticker.history(period=period)
-            hist.reset_index(inplace=True)
-            data[symbol] = hist[["Date", "Close", "Volume"]].to_dict(orient="records")
+            hist = bar_store.history(symbol, period=period)
+            hist = hist[hist["Close"].notna()]
+            if max_points:
+                hist = hist.iloc[
+                    lttb_indices(hist.index.asi8, hist["Close"].to_numpy(), max_points)
+                ]
+
+            if response_format == "columnar":
+                data[symbol] = {
+                    "time": (hist.index.as_unit("ms").asi8).tolist(),
+                    "close": hist["Close"].round(4).tolist(),
+                    "volume": hist["Volume"].astype("int64").tolist(),
+                }
+            else:
+                hist = hist.reset_index()
+                data[symbol] = hist[["Date", "Close", "Volume"]].to_dict(
+                    orient="records"
+                )
 
         return jsonify(data)
 
@@ -24,8 +155,7 @@ def init_compare(app):
 
         metrics = {}
         for symbol in symbols:
-            ticker = yf.Ticker(symbol)
-            info = ticker.info
+            info = get_provider().info(symbol)
             metrics[symbol] = {
                 "marketCap": info.get("marketCap"),
                 "peRatio": info.get("trailingPE"),
@@ -37,3 +167,58 @@ def init_compare(app):
             }
 
         return jsonify(metrics)
+
+    @app.route("/api/compare/analytics", methods=["GET"])
+    def get_comparison_analytics():
+        """Vectorized return/risk/correlation analytics for N symbols over one period"""
+        symbols = _symbol_args()
+        period = request.args.get("period", "1y")
+        benchmark = request.args.get("benchmark", "SPY").upper()
+        risk_free = request.args.get("risk_free", 0.0, type=float)
+
+        if not symbols:
+            return jsonify({"error": "No symbols provided"}), 400
+        if len(symbols) > MAX_ANALYTICS_SYMBOLS:
+            return (
+                jsonify({"error": f"At most {MAX_ANALYTICS_SYMBOLS} symbols allowed"}),
+                400,
+            )
+
+        load_symbols = symbols if benchmark in symbols else symbols + [benchmark]
+        try:
+            prices, missing = load_price_matrix(load_symbols, period)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        # A benchmark the caller did not ask for is reported on its own, not as missing
+        benchmark_missing = benchmark in missing
+        missing = [symbol for symbol in missing if symbol in symbols]
+
+        if prices.empty:
+            return (
+                jsonify({"error": "No price data available", "missing": missing}),
+                404,
+            )
+
+        result = compute_analytics(
+            prices, benchmark=benchmark, risk_free=risk_free, correlate=symbols
+        )
+        if benchmark not in symbols:
+            benchmark_metrics = result["metrics"].pop(benchmark, None)
+        else:
+            benchmark_metrics = result["metrics"].get(benchmark)
+
+        return jsonify(
+            {
+                "period": period,
+                "start": prices.index[0].strftime("%Y-%m-%d"),
+                "end": prices.index[-1].strftime("%Y-%m-%d"),
+                "benchmark": {
+                    "symbol": benchmark,
+                    "metrics": benchmark_metrics,
+                    "missing": benchmark_missing,
+                },
+                "metrics": result["metrics"],
+                "correlation": result["correlation"],
+                "missing": missing,
+            }
+        )
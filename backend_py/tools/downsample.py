@@ -0,0 +1,48 @@
+import numpy as np
+
+
+def lttb_indices(x, y, max_points):
+    """Indices of the points Largest-Triangle-Three-Buckets keeps out of (x, y).
+
+    The first and last points are always kept; the rest are split into
+    max_points - 2 buckets and from each the point forming the largest
+    triangle with the previously kept point and the next bucket's average
+    is chosen. Bucket averages and triangle areas are computed with NumPy,
+    so the only Python loop is one iteration per output point.
+    """
+    x = np.asarray(x, dtype="f8")
+    y = np.asarray(y, dtype="f8")
+    n = len(x)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+
+    buckets = max_points - 2
+    edges = np.linspace(1, n - 1, buckets + 1).astype(np.int64)
+
+    cum_x = np.concatenate(([0.0], np.cumsum(x)))
+    cum_y = np.concatenate(([0.0], np.cumsum(y)))
+    counts = edges[1:] - edges[:-1]
+    avg_x = (cum_x[edges[1:]] - cum_x[edges[:-1]]) / counts
+    avg_y = (cum_y[edges[1:]] - cum_y[edges[:-1]]) / counts
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(buckets):
+        lo, hi = edges[i], edges[i + 1]
+        area = np.abs(
+            (x[a] - next_x[i]) * (y[lo:hi] - y[a])
+            - (x[a] - x[lo:hi]) * (next_y[i] - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def lttb(x, y, max_points):
+    """Downsample (x, y) to at most max_points while preserving its visual shape"""
+    indices = lttb_indices(x, y, max_points)
+    return np.asarray(x)[indices], np.asarray(y)[indices]
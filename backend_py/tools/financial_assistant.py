@@ -1,110 +1,56 @@
-from flask import request, jsonify
-import requests
-import yfinance as yf
+from flask import Response, request, jsonify
+import itertools
+import json
 import re
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+from tools import http_client, intent_router, metrics
+from tools.answer_cache import answer_cache
+from tools.providers import get_provider
+from tools.scheduler import UpstreamBusy, scheduler
+from tools.sessions import history_messages, record_turn, resolve_tickers, session_store
+from tools.ticker_index import find_tickers, get_ticker_index
 
 GROQ_API_KEY = os.environ.get(
     "GROQ_API_KEY", "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"
 )
+GROQ_API_URL = os.environ.get(
+    "GROQ_API_URL", "https://api.groq.com/openai/v1/chat/completions"
+)
+GROQ_TIMEOUT = (http_client.CONNECT_TIMEOUT, 60)
 GROQ_MODEL = "llama-3.1-8b-instant"  # Best model for our financial assistant use case
+# Tickers answered per question, and snapshot fetches in flight across all questions
+MAX_QUERY_TICKERS = int(os.environ.get("MAX_QUERY_TICKERS", "5"))
+STOCK_FETCH_WORKERS = int(os.environ.get("STOCK_FETCH_WORKERS", "8"))
+BUSY_MESSAGE = (
+    "I'm answering a lot of questions right now. Please try again in a moment."
+)
+
 
-company_tickers = {
-    "apple": "AAPL",
-    "microsoft": "MSFT",
-    "google": "GOOGL",
-    "alphabet": "GOOGL",
-    "amazon": "AMZN",
-    "meta": "META",
-    "facebook": "META",
-    "tesla": "TSLA",
-    "netflix": "NFLX",
-    "nvidia": "NVDA",
-    "intel": "INTC",
-    "amd": "AMD",
-    "paypal": "PYPL",
-    "adobe": "ADBE",
-    "uber": "UBER",
-    "airbnb": "ABNB",
-    "spotify": "SPOT",
-    "zoom": "ZM",
-    "salesforce": "CRM",
-    "oracle": "ORCL",
-    "qualcomm": "QCOM",
-    "cisco": "CSCO",
-    "boeing": "BA",
-    "disney": "DIS",
-    "pepsico": "PEP",
-    "coca cola": "KO",
-    "walmart": "WMT",
-    "mcdonald's": "MCD",
-    "starbucks": "SBUX",
-    "nike": "NKE",
-    "visa": "V",
-    "mastercard": "MA",
-    "pfizer": "PFE",
-    "johnson & johnson": "JNJ",
-    "moderna": "MRNA",
-    "exxonmobil": "XOM",
-    "chevron": "CVX",
-    "lockheed martin": "LMT",
-    "at&t": "T",
-    "verizon": "VZ",
-    "ibm": "IBM",
-    "s&p 500": "^GSPC",
-    "dow jones": "^DJI",
-    "nasdaq": "^IXIC",
-    "russell 2000": "^RUT",
-    "reliance": "RELIANCE.NS",
-    "tcs": "TCS.NS",
-    "infosys": "INFY.NS",
-    "hdfc bank": "HDFCBANK.NS",
-    "icici bank": "ICICIBANK.NS",
-    "hcl tech": "HCLTECH.NS",
-    "kotak bank": "KOTAKBANK.NS",
-    "sbi": "SBIN.NS",
-    "l&t": "LT.NS",
-    "itc": "ITC.NS",
-    "asian paints": "ASIANPAINT.NS",
-    "wipro": "WIPRO.NS",
-    "ongc": "ONGC.NS",
-    "bpcl": "BPCL.NS",
-    "bharat electronics": "BEL.NS",
-}
+def extract_tickers(user_input):
+    """Extract every stock ticker mentioned in user input text, in order"""
+    return find_tickers(user_input)
 
 
 def extract_ticker(user_input):
     """Extract stock ticker from user input text"""
-    user_input_lower = user_input.lower()
-
-    for name, ticker in company_tickers.items():
-        if name in user_input_lower:
-            return ticker
-
-    possible_tickers = re.findall(r"\b[A-Z]{1,5}\b", user_input)
-    for ticker in possible_tickers:
-        try:
-            stock = yf.Ticker(ticker)
-            if not stock.history(period="1d").empty:
-                return ticker
-        except:
-            continue
-
-    return None
+    tickers = extract_tickers(user_input)
+    return tickers[0] if tickers else None
 
 
 def get_stock_data(ticker):
     """Get comprehensive stock data for a given ticker"""
     try:
-        stock = yf.Ticker(ticker)
-        data = stock.history(period="1d")
+        provider = get_provider()
+        data = provider.history(ticker, period="1d")
 
         if data.empty:
             return None
 
-        info = stock.info
+        info = provider.info(ticker)
 
         stock_data = {
             "ticker": ticker,
@@ -126,11 +72,108 @@ def get_stock_data(ticker):
         }
 
         return stock_data
+    except UpstreamBusy:
+        raise
     except Exception as e:
         print(f"Error fetching stock data: {e}")
         return None
 
 
+_stock_fetch_pool = ThreadPoolExecutor(
+    max_workers=STOCK_FETCH_WORKERS, thread_name_prefix="stock-fetch"
+)
+
+
+def get_stocks_data(tickers):
+    """Fetch snapshots for every ticker concurrently.
+
+    Returns (stock_data, missing): stock_data is None, a single snapshot
+    dict, or a list of them when more than one ticker has data, and
+    missing lists the tickers without data. Raises UpstreamBusy when the
+    market-data rate limit turns a fetch away.
+    """
+    if len(tickers) == 1:
+        snapshots = [get_stock_data(tickers[0])]
+    else:
+        snapshots = list(_stock_fetch_pool.map(get_stock_data, tickers))
+    found = [snapshot for snapshot in snapshots if snapshot]
+    missing = [ticker for ticker, snapshot in zip(tickers, snapshots) if not snapshot]
+    if not found:
+        return None, missing
+    return (found[0] if len(found) == 1 else found), missing
+
+
+def screen_candidates(tickers):
+    """Drop uppercase words outside the symbol directory that are not real tickers.
+
+    If the question also names a directory ticker they are dropped outright;
+    otherwise they are checked with one batched quotes() call and only the
+    ones with a quote go on to the full snapshot fetch.
+    """
+    index = get_ticker_index()
+    known = [ticker for ticker in tickers if index.knows(ticker)]
+    if known or not tickers:
+        return known
+    try:
+        quoted = get_provider().quotes(tickers)
+    except UpstreamBusy:
+        raise
+    except Exception as e:
+        print(f"Error checking candidate tickers: {e}")
+        return []
+    return [ticker for ticker in tickers if ticker in quoted]
+
+
+def drop_unknown_misses(tickers, missing):
+    """Forget uppercase words outside the symbol directory that had no data (FOMC, NYSE, ...).
+
+    Returns (tickers, missing) without them, so a question that named no
+    real ticker goes to the LLM instead of getting a ticker-not-found reply.
+    """
+    index = get_ticker_index()
+    unknown = {ticker for ticker in missing if not index.knows(ticker)}
+    return (
+        [ticker for ticker in tickers if ticker not in unknown],
+        [ticker for ticker in missing if ticker not in unknown],
+    )
+
+
+def not_found_message(tickers, partial=False):
+    """What to say for tickers without data; partial when other tickers are still answered"""
+    names = ", ".join(tickers)
+    if partial:
+        return f"I couldn't find current data for {names}. "
+    return f"I couldn't find current data for {names}. Please verify the ticker symbol or try a different query."
+
+
+def _format_number(value):
+    return f"{value:,}" if isinstance(value, (int, float)) else "Unknown"
+
+
+def format_stock_line(stock_data):
+    """One compact line of prompt context per stock"""
+    change_prefix = "+" if stock_data["change"] >= 0 else ""
+    percent_prefix = "+" if stock_data["change_percent"] >= 0 else ""
+    return (
+        f"{stock_data['company_name']} ({stock_data['ticker']}): "
+        f"price {stock_data['current_price']} {stock_data['currency']}, "
+        f"change {change_prefix}{stock_data['change']} ({percent_prefix}{stock_data['change_percent']}%), "
+        f"day range {stock_data['day_low']}-{stock_data['day_high']}, "
+        f"volume {_format_number(stock_data['volume'])}, "
+        f"market cap {_format_number(stock_data['market_cap'])}, "
+        f"P/E {stock_data['pe_ratio']}, sector {stock_data['sector']}, "
+        f"industry {stock_data['industry']}"
+    )
+
+
+def _answer_ticker(stock_data):
+    if not stock_data:
+        return None
+    if isinstance(stock_data, list):
+        return ",".join(snapshot["ticker"] for snapshot in stock_data)
+    return stock_data["ticker"]
+
+
 def format_stock_response(response_text):
     """Format the response to display stock data in a cleaner way"""
 
@@ -149,76 +192,192 @@ def format_stock_response(response_text):
     return cleaned_text
 
 
-def query_groq_with_stock_data(query, stock_data=None):
-    """Query Groq API with enhanced context if stock data available"""
-    try:
-        url = "https://api.groq.com/openai/v1/chat/completions"
-        headers = {
-            "Authorization": f"Bearer {GROQ_API_KEY}",
-            "Content-Type": "application/json",
-        }
+SYSTEM_PROMPT = (
+    "You are a professional financial advisor and stock market expert. "
+    "Give accurate, concise and professional answers about markets, stocks and the economy. "
+    "Show price increases as (+X.XX%) and decreases as (-X.XX%). "
+    "Use plain text only, without markdown symbols such as * or **."
+)
 
-        system_message = """You are a professional financial advisor and stock market expert. 
-        Provide accurate, helpful information about financial markets, stocks, and economic trends.
-        When discussing stock data, present price increases with (+X.XX%) and decreases with (-X.XX%).
-        Present data in a well-structured format that's easy to read.
-        Avoid using symbols like *, **, or other markdown that might not display correctly in the UI.
-        Keep responses concise but comprehensive and professional in tone.
-        Use plain text formatting without any special markdown symbols."""
-
-        if stock_data:
-            change_prefix = "+" if stock_data["change"] >= 0 else ""
-            percent_prefix = "+" if stock_data["change_percent"] >= 0 else ""
-
-            context = f"""
-            Current data for {stock_data['company_name']} ({stock_data['ticker']}):
-            Price: ${stock_data['current_price']} {stock_data['currency']}
-            Change: {change_prefix}{stock_data['change']} ({percent_prefix}{stock_data['change_percent']}%)
-            Day Range: ${stock_data['day_low']} - ${stock_data['day_high']}
-            Volume: {stock_data['volume']:,}
-            Market Cap: ${stock_data['market_cap']:,} if isinstance(stock_data['market_cap'], (int, float)) else Unknown
-            P/E Ratio: {stock_data['pe_ratio']}
-            Sector: {stock_data['sector']}
-            Industry: {stock_data['industry']}
-            Last Updated: {stock_data['updated_at']}
-            
-            User query: {query}
-            
-            Provide a helpful analysis based on this real-time data. Format your response in plain text without using markdown symbols.
-            """
-            user_message = context
-        else:
-            user_message = query
-
-        payload = {
-            "model": GROQ_MODEL,
-            "messages": [
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": user_message},
-            ],
-            "temperature": 0.5,
-            "max_tokens": 800,
-        }
 
-        response = requests.post(url, headers=headers, json=payload)
+def build_groq_payload(query, stock_data=None, stream=False, history=None):
+    """Build the chat-completions request body, with stock context if available.
+
+    stock_data is a single snapshot or a list of them, given to the model as
+    one compact line per stock. history holds earlier turns of the
+    conversation as chat messages (see sessions.history_messages).
+    """
+    if stock_data:
+        snapshots = stock_data if isinstance(stock_data, list) else [stock_data]
+        lines = "\n".join(format_stock_line(snapshot) for snapshot in snapshots)
+        updated_at = max(snapshot["updated_at"] for snapshot in snapshots)
+        user_message = (
+            f"Current data (last updated {updated_at}):\n{lines}\n\n"
+            f"User query: {query}\n\n"
+            "Answer using this real-time data."
+        )
+    else:
+        user_message = query
+
+    payload = {
+        "model": GROQ_MODEL,
+        "messages": [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            *(history or []),
+            {"role": "user", "content": user_message},
+        ],
+        "temperature": 0.5,
+        "max_tokens": 800,
+    }
+    if stream:
+        payload["stream"] = True
+    return payload
+
+
+class GroqResponseError(Exception):
+    """The chat-completions API answered without any choices"""
+
+
+def _complete(query, stock_data=None, history=None):
+    headers = {
+        "Authorization": f"Bearer {GROQ_API_KEY}",
+        "Content-Type": "application/json",
+    }
+
+    payload = build_groq_payload(query, stock_data, history=history)
+
+    scheduler.acquire("groq")
+    with metrics.upstream_timer("groq", "completion"):
+        response = http_client.post(
+            GROQ_API_URL, headers=headers, json=payload, timeout=GROQ_TIMEOUT
+        )
         result = response.json()
+    intent_router.record_groq_call(result.get("usage"))
 
-        if "choices" in result and len(result["choices"]) > 0:
-            response_text = result["choices"][0]["message"]["content"]
+    if "choices" in result and len(result["choices"]) > 0:
+        response_text = result["choices"][0]["message"]["content"]
+        return format_stock_response(response_text)
 
-            formatted_response = format_stock_response(response_text)
-            return formatted_response
-        else:
-            print("Unexpected response from Groq API:", result)
-            return "I'm having trouble processing your request. Please try again."
+    print("Unexpected response from Groq API:", result)
+    raise GroqResponseError(str(result))
 
+
+def query_groq_with_stock_data(query, stock_data=None, history=None):
+    """Query Groq API with enhanced context if stock data available"""
+    ticker = _answer_ticker(stock_data)
+    try:
+        if history:
+            # An answer that builds on earlier turns is not reused by other conversations
+            return _complete(query, stock_data, history)
+        return answer_cache.get_or_compute(
+            query, ticker, stock_data, lambda: _complete(query, stock_data)
+        )
+    except GroqResponseError:
+        return "I'm having trouble processing your request. Please try again."
+    except UpstreamBusy:
+        return BUSY_MESSAGE
     except Exception as e:
         print(f"Error querying Groq: {e}")
         return f"I encountered an error while processing your request. Please try again later."
 
 
+class SentenceStream:
+    """Buffers streamed tokens and releases whole sentences, cleaned by format_stock_response.
+
+    Cleaning per sentence rather than per token means markdown markers split
+    across chunks ("*" + "*") are still removed, and a speech synthesizer can
+    start on the first complete sentence.
+    """
+
+    boundary = re.compile(r"(?<=[.!?:])\s+|\n+")
+
+    def __init__(self):
+        self.buffer = ""
+
+    def feed(self, text):
+        self.buffer += text
+        sentences = []
+        while True:
+            match = self.boundary.search(self.buffer)
+            if match is None:
+                break
+            sentence = self.buffer[: match.end()]
+            self.buffer = self.buffer[match.end() :]
+            if sentence.strip():
+                sentences.append(format_stock_response(sentence))
+        return sentences
+
+    def flush(self):
+        sentence, self.buffer = self.buffer, ""
+        return [format_stock_response(sentence)] if sentence.strip() else []
+
+
+def stream_groq_with_stock_data(query, stock_data=None, history=None):
+    """Stream the Groq completion, yielding cleaned text one sentence at a time"""
+    ticker = _answer_ticker(stock_data)
+    sentences = SentenceStream()
+
+    cached = None if history else answer_cache.get(query, ticker, stock_data)
+    if cached is not None:
+        yield from sentences.feed(cached)
+        yield from sentences.flush()
+        return
+
+    headers = {
+        "Authorization": f"Bearer {GROQ_API_KEY}",
+        "Content-Type": "application/json",
+    }
+    payload = build_groq_payload(query, stock_data, stream=True, history=history)
+    answer = []
+    usage = None
+
+    try:
+        scheduler.acquire("groq")
+        with metrics.upstream_timer("groq", "stream"), http_client.post(
+            GROQ_API_URL,
+            headers=headers,
+            json=payload,
+            stream=True,
+            timeout=GROQ_TIMEOUT,
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[len("data:") :].strip()
+                if data == "[DONE]":
+                    break
+                chunk = json.loads(data)
+                usage = (
+                    chunk.get("usage") or chunk.get("x_groq", {}).get("usage") or usage
+                )
+                choices = chunk.get("choices") or [{}]
+                delta = choices[0].get("delta", {}).get("content")
+                if delta:
+                    for sentence in sentences.feed(delta):
+                        answer.append(sentence)
+                        yield sentence
+        intent_router.record_groq_call(usage)
+        for sentence in sentences.flush():
+            answer.append(sentence)
+            yield sentence
+        if answer and not history:
+            answer_cache.set(query, ticker, stock_data, "".join(answer))
+    except UpstreamBusy:
+        yield BUSY_MESSAGE
+    except Exception as e:
+        print(f"Error streaming from Groq: {e}")
+        yield from sentences.flush()
+        yield "I encountered an error while processing your request. Please try again later."
+
+
+def _sse(event):
+    return f"data: {json.dumps(event)}\n\n"
+
+
 def init_financial_assistant(app):
     """Initialize financial assistant routes on the Flask app"""
+    get_ticker_index()
 
     @app.route("/api/speech/text", methods=["POST"])
     def process_speech():
@@ -227,27 +386,131 @@ def init_financial_assistant(app):
             return jsonify({"error": "No text provided"}), 400
 
         query = request.json["text"]
-
-        ticker = extract_ticker(query)
-
-        if ticker:
-
-            stock_data = get_stock_data(ticker)
-
-            if stock_data:
-
-                response = query_groq_with_stock_data(query, stock_data)
-            else:
-                response = f"I couldn't find current data for {ticker}. Please verify the ticker symbol or try a different query."
+        start = time.perf_counter()
+        session_id, session = session_store.load(request.json.get("session_id"))
+
+        with metrics.stage_timer("extract_ticker"):
+            tickers, follow_up = resolve_tickers(
+                query, extract_tickers(query)[:MAX_QUERY_TICKERS], session
+            )
+
+        stock_data, missing, busy = None, [], False
+        if tickers:
+
+            with metrics.stage_timer("get_stock_data"):
+                try:
+                    if not follow_up:
+                        tickers = screen_candidates(tickers)
+                    stock_data, missing = get_stocks_data(tickers)
+                except UpstreamBusy:
+                    busy = True
+            tickers, missing = drop_unknown_misses(tickers, missing)
+
+        intents, response = intent_router.route(query, stock_data)
+        if busy:
+            path, response = "busy", BUSY_MESSAGE
+        elif response is not None:
+            path = "template"
+        elif tickers and not stock_data:
+            path, response = "not_found", not_found_message(missing)
         else:
+            path = "llm"
+            with metrics.stage_timer("groq"):
+                response = query_groq_with_stock_data(
+                    query, stock_data, history_messages(session) if follow_up else None
+                )
+        if missing and stock_data:
+            response = not_found_message(missing, partial=True) + response
+
+        intent_router.record_answer(path, time.perf_counter() - start, intents)
+        if not busy:
+            record_turn(session, query, response, tickers)
+            session_store.save(session_id, session)
+        return jsonify({"response": response, "session_id": session_id})
+
+    @app.route("/api/speech/stream", methods=["POST"])
+    def stream_speech():
+        """Stream the AI response as server-sent events, one sentence per event"""
+        if not request.json or "text" not in request.json:
+            return jsonify({"error": "No text provided"}), 400
 
-            response = query_groq_with_stock_data(query)
-
-        return jsonify({"response": response})
+        query = request.json["text"]
+        start = time.perf_counter()
+        session_id, session = session_store.load(request.json.get("session_id"))
+
+        with metrics.stage_timer("extract_ticker"):
+            tickers, follow_up = resolve_tickers(
+                query, extract_tickers(query)[:MAX_QUERY_TICKERS], session
+            )
+        stock_data, missing, busy = None, [], False
+        if tickers:
+            with metrics.stage_timer("get_stock_data"):
+                try:
+                    if not follow_up:
+                        tickers = screen_candidates(tickers)
+                    stock_data, missing = get_stocks_data(tickers)
+                except UpstreamBusy:
+                    busy = True
+            tickers, missing = drop_unknown_misses(tickers, missing)
+        intents, answer = intent_router.route(query, stock_data)
+
+        def events():
+            if busy:
+                path, sentences = "busy", [BUSY_MESSAGE]
+            elif answer is not None:
+                path, sentences = "template", [answer]
+            elif tickers and not stock_data:
+                path, sentences = "not_found", [not_found_message(missing)]
+            else:
+                path = "llm"
+                sentences = stream_groq_with_stock_data(
+                    query, stock_data, history_messages(session) if follow_up else None
+                )
+            if missing and stock_data:
+                sentences = itertools.chain(
+                    [not_found_message(missing, partial=True)], sentences
+                )
+
+            yield _sse(
+                {
+                    "type": "start",
+                    "session_id": session_id,
+                    "ticker": tickers[0] if tickers else None,
+                    "tickers": tickers,
+                    "stock_data": stock_data,
+                }
+            )
+            response = []
+            for sentence in sentences:
+                response.append(sentence)
+                yield _sse({"type": "sentence", "text": sentence})
+            intent_router.record_answer(path, time.perf_counter() - start, intents)
+            if not busy:
+                record_turn(session, query, "".join(response), tickers)
+                session_store.save(session_id, session)
+            yield _sse(
+                {
+                    "type": "done",
+                    "response": "".join(response),
+                    "session_id": session_id,
+                }
+            )
+
+        return Response(
+            events(),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
 
     @app.route("/financial-assistant/health", methods=["GET"])
     def financial_assistant_health():
         """Health check endpoint for the financial assistant tool"""
-        return jsonify({"status": "ok", "service": "groq-stock-assistant"})
+        return jsonify(
+            {
+                "status": "ok",
+                "service": "groq-stock-assistant",
+                "paths": intent_router.stats(),
+            }
+        )
 
     print("✅ Financial Assistant tool initialized")
@@ -0,0 +1,151 @@
+import os
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from tools import metrics
+
+CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", "3.05"))
+READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", "15"))
+MAX_RETRIES = int(os.environ.get("HTTP_MAX_RETRIES", "2"))
+BACKOFF_BASE = 0.25
+BACKOFF_MAX = 4.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Methods safe to resend after a read timeout or a dropped connection
+RETRY_ANY_ERROR_METHODS = {"GET", "HEAD"}
+POOL_HOSTS = 16
+POOL_SIZE_PER_HOST = int(os.environ.get("HTTP_POOL_SIZE", "32"))
+
+
+class HostStats:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.last_status = None
+
+    def as_dict(self):
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "avg_ms": (
+                round(self.total_seconds / self.requests * 1000, 2)
+                if self.requests
+                else 0.0
+            ),
+            "max_ms": round(self.max_seconds * 1000, 2),
+            "last_status": self.last_status,
+        }
+
+
+class PooledSession(requests.Session):
+    """requests.Session with per-host keep-alive pools, default timeouts and retries.
+
+    Every request gets (CONNECT_TIMEOUT, READ_TIMEOUT) unless the caller
+    passes its own timeout. 429/5xx answers and failures to connect are
+    retried up to `retries` times with full-jitter exponential backoff,
+    honouring Retry-After when the upstream sends one. Read timeouts and
+    dropped connections are only retried for GET and HEAD, since a POST may
+    already have been processed. Latency, errors and retries are tallied
+    per host.
+    """
+
+    def __init__(self, retries=MAX_RETRIES, pool_size=POOL_SIZE_PER_HOST):
+        super().__init__()
+        self.retries = retries
+        adapter = HTTPAdapter(
+            pool_connections=POOL_HOSTS, pool_maxsize=pool_size, max_retries=0
+        )
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
+    def _record(self, host, seconds, status=None, error=False, retry=False):
+        with self._stats_lock:
+            stats = self._stats.setdefault(host, HostStats())
+            stats.requests += 1
+            stats.total_seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, seconds)
+            stats.errors += int(error)
+            stats.retries += int(retry)
+            if status is not None:
+                stats.last_status = status
+        metrics.http_client_duration.observe(seconds, host=host)
+        if error:
+            metrics.http_client_errors.inc(host=host)
+
+    def _backoff(self, attempt, response=None):
+        if response is not None:
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                return min(float(retry_after), BACKOFF_MAX)
+        return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2**attempt))
+
+    def _retryable(self, method, error):
+        if method.upper() in RETRY_ANY_ERROR_METHODS:
+            return True
+        if isinstance(error, requests.ConnectTimeout):
+            return True
+        # The connection was never made (refused, unreachable, DNS failure)
+        reason = getattr(error.args[0], "reason", None) if error.args else None
+        return isinstance(reason, NewConnectionError)
+
+    def request(self, method, url, *args, retries=None, **kwargs):
+        kwargs.setdefault("timeout", (CONNECT_TIMEOUT, READ_TIMEOUT))
+        retries = self.retries if retries is None else retries
+        host = urlparse(url).hostname or ""
+
+        for attempt in range(retries + 1):
+            start = time.perf_counter()
+            try:
+                response = super().request(method, url, *args, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                retry = attempt < retries and self._retryable(method, e)
+                self._record(host, time.perf_counter() - start, error=True, retry=retry)
+                if not retry:
+                    raise
+                time.sleep(self._backoff(attempt))
+                continue
+
+            retry = response.status_code in RETRY_STATUSES and attempt < retries
+            self._record(
+                host,
+                time.perf_counter() - start,
+                status=response.status_code,
+                error=response.status_code >= 500,
+                retry=retry,
+            )
+            if not retry:
+                return response
+            delay = self._backoff(attempt, response)
+            response.close()
+            time.sleep(delay)
+
+    def host_stats(self):
+        """Per-host request counts, error/retry counts and latency"""
+        with self._stats_lock:
+            return {host: stats.as_dict() for host, stats in self._stats.items()}
+
+
+session = PooledSession()
+
+
+def get(url, **kwargs):
+    return session.get(url, **kwargs)
+
+
+def post(url, **kwargs):
+    return session.post(url, **kwargs)
+
+
+def host_stats():
+    return session.host_stats()
@@ -0,0 +1,136 @@
+import json
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+ENCODINGS = ("json", "msgpack")
+
+
+def _split(values):
+    items = []
+    for value in values or []:
+        if isinstance(value, str):
+            items.extend(v.strip() for v in value.split(",") if v.strip())
+        else:
+            items.append(str(value))
+    return set(items)
+
+
+class IndexStreamSession:
+    """Per-connection state for the /ws/market-indices protocol, shared by the Flask and ASGI sockets.
+
+    Legacy clients (no query parameters, no messages) get the full JSON
+    payload as before, but only when it differs from the last one sent.
+
+    Delta clients (`?mode=delta`, or after sending any action) get a
+    {"type": "snapshot", "seq", "data"} message followed by
+    {"type": "delta", "seq", "data"} messages that hold only the entries
+    whose price or change moved. `seq` goes up by one per message, so a
+    client that sees a gap sends {"action": "resync"} for a new snapshot.
+    {"action": "subscribe", "regions": [...], "symbols": [...]} narrows the
+    stream (an entry is sent if its region or its symbol is subscribed) and
+    answers with a snapshot. `encoding=msgpack` switches to binary frames
+    when msgpack is installed.
+    """
+
+    def __init__(self, mode="legacy", regions=None, symbols=None, encoding="json"):
+        self.delta = mode == "delta"
+        self.regions = _split(regions)
+        self.symbols = _split(symbols)
+        self.encoding = encoding if encoding in ENCODINGS else "json"
+        if self.encoding == "msgpack" and msgpack is None:
+            self.encoding = "json"
+        self.seq = 0
+        self.sent = {}
+        self.needs_snapshot = True
+        self._last_payload = None
+
+    @classmethod
+    def from_params(cls, get, getlist):
+        """Build a session from query parameters (accessor functions like request.args)"""
+        return cls(
+            mode=get("mode", "legacy"),
+            regions=getlist("regions"),
+            symbols=getlist("symbols"),
+            encoding=get("encoding", "json"),
+        )
+
+    def handle_message(self, message):
+        """Apply a client action; returns True if a frame should be sent right away"""
+        try:
+            if isinstance(message, bytes) and msgpack is not None:
+                action = msgpack.unpackb(message)
+            else:
+                action = json.loads(message)
+        except Exception:
+            return False
+        if not isinstance(action, dict):
+            return False
+
+        name = action.get("action")
+        if name == "subscribe":
+            self.regions = _split(action.get("regions"))
+            self.symbols = _split(action.get("symbols"))
+        elif name != "resync":
+            return False
+        if action.get("encoding") in ENCODINGS:
+            self.encoding = action["encoding"]
+            if self.encoding == "msgpack" and msgpack is None:
+                self.encoding = "json"
+        self.delta = True
+        self.needs_snapshot = True
+        return True
+
+    def _wanted(self, region, symbol):
+        if not self.regions and not self.symbols:
+            return True
+        return region in self.regions or symbol in self.symbols
+
+    def _encode(self, message):
+        if self.encoding == "msgpack":
+            return msgpack.packb(message)
+        return json.dumps(message)
+
+    def render(self, data, payload):
+        """Frame to send for the latest index data (str or bytes), or None if nothing to send"""
+        if data is None:
+            return None
+        if not self.delta:
+            if payload == self._last_payload:
+                return None
+            self._last_payload = payload
+            return payload
+
+        snapshot = self.needs_snapshot
+        changes = {}
+        for region, entries in data.items():
+            for entry in entries:
+                symbol = entry["symbol"]
+                if not self._wanted(region, symbol):
+                    continue
+                state = (entry["price"], entry["change"])
+                if snapshot or self.sent.get(symbol) != state:
+                    changes.setdefault(region, []).append(entry)
+                    self.sent[symbol] = state
+
+        if snapshot:
+            self.needs_snapshot = False
+            self.sent = {
+                entry["symbol"]: (entry["price"], entry["change"])
+                for entries in changes.values()
+                for entry in entries
+            }
+        elif not changes:
+            return None
+
+        self.seq += 1
+        message = {
+            "type": "snapshot" if snapshot else "delta",
+            "seq": self.seq,
+            "data": changes,
+        }
+        if snapshot:
+            message["encoding"] = self.encoding
+        return self._encode(message)
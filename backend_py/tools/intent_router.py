@@ -0,0 +1,176 @@
+import re
+import threading
+
+from tools import metrics
+
+# Longer questions are almost always asking for analysis rather than a single figure
+SIMPLE_MAX_WORDS = 16
+
+INTENT_PATTERNS = {
+    "price": re.compile(
+        r"\b(price|prices|trading at|quote|how much is|how much does|worth|cost|costs)\b"
+    ),
+    "change": re.compile(
+        r"\b(change|changed|move|moved|moving|up|down|gain|gained|lose|lost|drop|dropped"
+        r"|fall|fell|rise|rose|doing|perform|performing|performed)\b"
+    ),
+    "range": re.compile(r"\b(range|high|highs|low|lows)\b"),
+    "volume": re.compile(r"\b(volume|shares traded|how many shares)\b"),
+    "market_cap": re.compile(
+        r"\b(market ?cap|market capitali[sz]ation|mcap|how big)\b"
+    ),
+}
+# Anything that asks for judgement, comparison or explanation goes to the LLM
+OPEN_ENDED = re.compile(
+    r"\b(should|why|buy|sell|hold|invest|investing|analy[sz]e|analysis|compare|comparison"
+    r"|vs|versus|better|worse|outlook|forecast|predict|expect|future|recommend|opinion"
+    r"|think|news|explain|risk|risky|worried|valuation|fundamentals|tell me about"
+    r"|overview|summary|summari[sz]e|worth buying)\b"
+)
+# A period or a metric the snapshot does not hold means today's figures cannot answer it
+QUALIFIERS = re.compile(
+    r"\b(week|weeks|weekly|month|months|monthly|year|years|yearly|annual|annually"
+    r"|quarter|quarterly|52|all[- ]time|ytd|target|targets|p/?e|pe ratio|ratio"
+    r"|earnings|eps|dividend|dividends|yield|revenue|profit|margin|margins"
+    r"|(last|this|past|previous|next) \w+|since|ago|history|historical|record|compar\w*)\b"
+)
+INTENT_ORDER = ("price", "change", "range", "volume", "market_cap")
+
+PATHS = ("template", "llm", "not_found", "busy")
+
+answers = metrics.Counter(
+    "speech_answers_total",
+    "Voice answers by path (template, llm, not_found or busy) and intent",
+    ["path", "intent"],
+)
+answer_duration = metrics.Histogram(
+    "speech_answer_duration_seconds",
+    "Time from receiving a voice query to having its answer, by path",
+    ["path"],
+)
+groq_tokens = metrics.Counter(
+    "groq_tokens_total",
+    "Tokens reported by Groq completions, by kind",
+    ["kind"],
+)
+
+_lock = threading.Lock()
+_stats = {
+    path: {"answers": 0, "seconds": 0.0, "groq_calls": 0, "groq_tokens": 0}
+    for path in PATHS
+}
+
+
+def classify(query):
+    """Intents of a simple quote question in asking order, or [] if it needs the LLM"""
+    text = query.lower().replace("’", "'")
+    if (
+        len(text.split()) > SIMPLE_MAX_WORDS
+        or OPEN_ENDED.search(text)
+        or QUALIFIERS.search(text)
+    ):
+        return []
+    found = []
+    for intent in INTENT_ORDER:
+        match = INTENT_PATTERNS[intent].search(text)
+        if match:
+            found.append((match.start(), intent))
+    return [intent for start, intent in sorted(found)]
+
+
+def _money(value, currency):
+    return f"{value:,.2f} {currency}"
+
+
+def _large(value):
+    for size, word in ((1e12, "trillion"), (1e9, "billion"), (1e6, "million")):
+        if value >= size:
+            return f"{value / size:,.2f} {word}"
+    return f"{value:,.0f}"
+
+
+def _sentence(intent, stock):
+    name = f"{stock['company_name']} ({stock['ticker']})"
+    currency = stock["currency"]
+    if intent == "price":
+        return f"{name} is trading at {_money(stock['current_price'], currency)}."
+    if intent == "change":
+        change = stock["change"]
+        if change == 0:
+            return (
+                f"{name} is flat today at {_money(stock['current_price'], currency)}."
+            )
+        direction = "up" if change > 0 else "down"
+        sign = "+" if change > 0 else "-"
+        return (
+            f"{name} is {direction} {_money(abs(change), currency)} today "
+            f"({sign}{abs(stock['change_percent']):.2f}%)."
+        )
+    if intent == "range":
+        return (
+            f"{name} has traded between {_money(stock['day_low'], currency)} "
+            f"and {_money(stock['day_high'], currency)} today."
+        )
+    if intent == "volume":
+        return f"{name} has traded {stock['volume']:,} shares today."
+    market_cap = stock["market_cap"]
+    if not isinstance(market_cap, (int, float)):
+        return f"I don't have a market cap figure for {name}."
+    return f"{name} has a market cap of {_large(market_cap)} {currency}."
+
+
+def template_answer(intents, stock_data):
+    """Answer from the snapshot(s) alone; stock_data is one snapshot dict or a list"""
+    stocks = stock_data if isinstance(stock_data, list) else [stock_data]
+    return " ".join(_sentence(intent, stock) for stock in stocks for intent in intents)
+
+
+def route(query, stock_data):
+    """(intents, answer) for a simple question about stocks we have data for, else ([], None)"""
+    if not stock_data:
+        return [], None
+    intents = classify(query)
+    if not intents:
+        return [], None
+    return intents, template_answer(intents, stock_data)
+
+
+def record_answer(path, seconds, intents=()):
+    """Count one voice answer and its latency under its path"""
+    answers.inc(path=path, intent="+".join(intents) or "none")
+    answer_duration.observe(seconds, path=path)
+    with _lock:
+        _stats[path]["answers"] += 1
+        _stats[path]["seconds"] += seconds
+
+
+def record_groq_call(usage=None):
+    """Count one Groq completion made for the LLM path, with its reported token usage"""
+    usage = usage or {}
+    with _lock:
+        _stats["llm"]["groq_calls"] += 1
+        _stats["llm"]["groq_tokens"] += int(
+            usage.get("total_tokens")
+            or (usage.get("prompt_tokens") or 0) + (usage.get("completion_tokens") or 0)
+        )
+    for kind in ("prompt_tokens", "completion_tokens"):
+        if usage.get(kind):
+            groq_tokens.inc(int(usage[kind]), kind=kind.split("_")[0])
+
+
+def stats():
+    """Answers, average latency and Groq quota spent per path"""
+    with _lock:
+        return {
+            path: {
+                "answers": entry["answers"],
+                "avg_ms": (
+                    round(entry["seconds"] / entry["answers"] * 1000, 2)
+                    if entry["answers"]
+                    else 0.0
+                ),
+                "groq_calls": entry["groq_calls"],
+                "groq_tokens": entry["groq_tokens"],
+            }
+            for path, entry in _stats.items()
+        }
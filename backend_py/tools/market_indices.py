@@ -1,6 +1,14 @@
-import yfinance as yf
+import asyncio
 import json
-import time
+import threading
+
+from simple_websocket import ConnectionClosed
+
+from tools.cache import create_cache
+from tools.index_stream import IndexStreamSession
+from tools.metrics import Gauge
+from tools.providers import get_provider
+from tools.scheduler import MAX_WAIT_SECONDS, UpstreamBusy, priority
 
 INDICES = {
     "India": [
@@ -35,38 +43,239 @@ INDEX_NAMES = {
     "NIFTYBANK.NS": "Nifty Bank",
     "NIFTYIT.NS": "Nifty IT",
     "CNXPHARMA.NS": "Nifty Pharma",
+    "^N225": "Nikkei 225",
+    "^HSI": "Hang Seng Index",
+    "000001.SS": "SSE Composite Index",
+    "^KS11": "KOSPI Composite Index",
+    "^TWII": "TSEC Weighted Index",
+    "^STI": "STI Index",
+    "^GSPC": "S&P 500",
+    "^IXIC": "NASDAQ Composite",
+    "^DJI": "Dow Jones Industrial Average",
+    "^RUT": "Russell 2000",
+    "^VIX": "CBOE Volatility Index",
+    "^FTSE": "FTSE 100",
+    "^GDAXI": "DAX",
+    "^FCHI": "CAC 40",
+    "^STOXX50E": "EURO STOXX 50",
 }
 
 
 def fetch_index_data():
+    symbols = [symbol for group in INDICES.values() for symbol in group]
+    try:
+        quotes = get_provider().quotes(symbols)
+    except UpstreamBusy:
+        # Let the broadcaster keep the last snapshot rather than blank every price
+        raise
+    except Exception as e:
+        print(f"Error fetching index quotes: {str(e)}")
+        quotes = {}
+
     data = {}
     for region, symbols in INDICES.items():
         data[region] = []
         for symbol in symbols:
-            try:
-                ticker = yf.Ticker(symbol)
-                info = ticker.info
-                price = info.get("regularMarketPrice", "N/A")
-                change = info.get("regularMarketChangePercent", "N/A")
+            price, change = "N/A", "N/A"
+            quote = quotes.get(symbol)
+            if quote:
+                price = round(quote["price"], 2)
+                prev_close = quote["previous_close"]
+                if prev_close:
+                    change = round(
+                        ((quote["price"] - prev_close) / prev_close) * 100, 2
+                    )
+            data[region].append(
+                {
+                    "symbol": symbol,
+                    "name": INDEX_NAMES.get(symbol, symbol),
+                    "price": price,
+                    "change": change,
+                }
+            )
+    return data
+
+
+# Kept a little under the broadcast interval so every poll after the first in a round is a hit
+INDEX_CACHE_TTL = 9
+
+# How long the last good snapshot stays available to serve while the upstream is busy
+LAST_GOOD_TTL = 3600
+
+index_cache = create_cache("market_indices", default_ttl=INDEX_CACHE_TTL, max_entries=2)
+
+
+def _fetch_and_keep():
+    data = fetch_index_data()
+    index_cache.set("last_good", data, LAST_GOOD_TTL)
+    return data
 
-                name = INDEX_NAMES.get(symbol, info.get("shortName", symbol))
 
-                data[region].append(
-                    {"symbol": symbol, "name": name, "price": price, "change": change}
+def shared_index_data():
+    """Index data fetched by at most one worker per INDEX_CACHE_TTL and shared with the rest"""
+    with priority("dashboard"):
+        return index_cache.get_or_compute("snapshot", _fetch_and_keep)
+
+
+def index_snapshot():
+    """(data, stale): shared index data, or the last good snapshot while the upstream is busy"""
+    try:
+        return shared_index_data(), False
+    except UpstreamBusy:
+        data = index_cache.get("last_good")
+        if data is None:
+            raise
+        return data, True
+
+
+# How often a Flask socket thread checks for client actions between broadcasts
+CLIENT_POLL_SECONDS = 1.0
+
+
+class IndexBroadcaster:
+    """Refreshes index data on one background thread and shares it with every subscriber"""
+
+    def __init__(self, fetch=shared_index_data, interval=10):
+        self.fetch = fetch
+        self.interval = interval
+        self._cond = threading.Condition()
+        self._subscribers = 0
+        self._thread = None
+        self._version = 0
+        self._data = None
+        self._payload = None
+
+    @property
+    def subscribers(self):
+        with self._cond:
+            return self._subscribers
+
+    def subscribe(self):
+        """Register a client and start the poller if it is not already running"""
+        with self._cond:
+            self._subscribers += 1
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="market-indices-poller", daemon=True
                 )
+                self._thread.start()
+
+    def unsubscribe(self):
+        """Remove a client; the poller exits once nobody is left"""
+        with self._cond:
+            self._subscribers = max(0, self._subscribers - 1)
+            self._cond.notify_all()
+
+    def wait_for_update(self, last_version, timeout=None):
+        """Block until data newer than last_version exists, return (version, data, payload)"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._version != last_version, timeout)
+            return self._version, self._data, self._payload
 
-                time.sleep(0.2)
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._subscribers == 0:
+                    self._thread = None
+                    return
+
+            try:
+                data = self.fetch()
+                payload = json.dumps(data)
             except Exception as e:
-                print(f"Error fetching {symbol}: {str(e)}")
-                data[region].append(
-                    {
-                        "symbol": symbol,
-                        "name": INDEX_NAMES.get(symbol, symbol),
-                        "price": "N/A",
-                        "change": "N/A",
-                    }
-                )
-    return data
+                print(f"Error refreshing market indices: {str(e)}")
+                payload = None
+
+            with self._cond:
+                # Unchanged data is not a new version, so nobody is woken for it
+                if payload is not None and payload != self._payload:
+                    self._data = data
+                    self._payload = payload
+                    self._version += 1
+                    self._cond.notify_all()
+                self._cond.wait_for(lambda: self._subscribers == 0, self.interval)
+
+
+class AsyncIndexBroadcaster:
+    """asyncio counterpart of IndexBroadcaster for the ASGI server.
+
+    Subscribers are coroutines rather than threads, so idle sockets cost
+    only their connection state. The fetch still runs on `executor`, off
+    the event loop.
+    """
+
+    def __init__(self, fetch=shared_index_data, interval=10, executor=None):
+        self.fetch = fetch
+        self.interval = interval
+        self.executor = executor
+        self._subscribers = 0
+        self._task = None
+        self._version = 0
+        self._data = None
+        self._payload = None
+        self._updated = None
+        self._idle = None
+
+    @property
+    def subscribers(self):
+        return self._subscribers
+
+    def subscribe(self):
+        """Register a client and start the poller task if it is not already running"""
+        if self._updated is None:
+            self._updated = asyncio.Event()
+            self._idle = asyncio.Event()
+        self._subscribers += 1
+        self._idle.clear()
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def unsubscribe(self):
+        """Remove a client; the poller task exits once nobody is left"""
+        self._subscribers = max(0, self._subscribers - 1)
+        if self._subscribers == 0:
+            self._idle.set()
+
+    def latest(self):
+        return self._data, self._payload
+
+    async def wait_for_update(self, last_version):
+        """Wait until data newer than last_version exists, return (version, data, payload)"""
+        while self._version == last_version:
+            await self._updated.wait()
+        return self._version, self._data, self._payload
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while self._subscribers:
+                try:
+                    data = await loop.run_in_executor(self.executor, self.fetch)
+                    payload = json.dumps(data)
+                    if payload != self._payload:
+                        self._data = data
+                        self._payload = payload
+                        self._version += 1
+                        updated, self._updated = self._updated, asyncio.Event()
+                        updated.set()
+                except Exception as e:
+                    print(f"Error refreshing market indices: {str(e)}")
+                try:
+                    await asyncio.wait_for(self._idle.wait(), self.interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._task = None
+
+
+broadcaster = IndexBroadcaster()
+async_broadcaster = AsyncIndexBroadcaster()
+
+Gauge(
+    "websocket_clients",
+    "Connected /ws/market-indices clients",
+    lambda: broadcaster.subscribers + async_broadcaster.subscribers,
+)
 
 
 def init_market_indices(app, sock):
@@ -75,30 +284,62 @@ def init_market_indices(app, sock):
     @sock.route("/ws/market-indices")
     def dashboard(ws):
         """WebSocket endpoint for streaming real-time market indices data"""
+        session = IndexStreamSession.from_params(request.args.get, request.args.getlist)
+        broadcaster.subscribe()
         try:
-            while True:
-                live_data = fetch_index_data()
-                ws.send(json.dumps(live_data))
-
-                time.sleep(10)
+            version = 0
+            while ws.connected:
+                new_version, data, payload = broadcaster.wait_for_update(
+                    version, timeout=CLIENT_POLL_SECONDS
+                )
+                poked = False
+                message = ws.receive(timeout=0)
+                while message is not None:
+                    poked = session.handle_message(message) or poked
+                    message = ws.receive(timeout=0)
+                if new_version != version or poked:
+                    version = new_version
+                    frame = session.render(data, payload)
+                    if frame is not None:
+                        ws.send(frame)
+        except ConnectionClosed:
+            pass
         except Exception as e:
             print(f"WebSocket error: {str(e)}")
+        finally:
+            broadcaster.unsubscribe()
 
     @app.route("/market-indices/data", methods=["GET"])
     def get_market_indices():
-        """REST endpoint to fetch market indices data once"""
+        """REST endpoint to fetch market indices data once.
+
+        While the upstream is over its rate limit the last good snapshot is
+        served with an X-Data-Stale header, or 503 if there is none yet.
+        """
         try:
-            data = fetch_index_data()
-            return jsonify(data)
+            data, stale = index_snapshot()
+        except UpstreamBusy as e:
+            retry_after = str(int(MAX_WAIT_SECONDS["dashboard"]))
+            return jsonify({"error": str(e)}), 503, {"Retry-After": retry_after}
         except Exception as e:
             return jsonify({"error": str(e)}), 500
+        response = jsonify(data)
+        if stale:
+            response.headers["X-Data-Stale"] = "true"
+        return response
 
     @app.route("/market-indices/health", methods=["GET"])
     def market_indices_health():
         """Health check endpoint for the market indices tool"""
-        return jsonify({"status": "ok", "service": "market-indices-websocket"})
+        return jsonify(
+            {
+                "status": "ok",
+                "service": "market-indices-websocket",
+                "clients": broadcaster.subscribers + async_broadcaster.subscribers,
+            }
+        )
 
     print("✅ Market Indices tool initialized with focus on Indian markets")
 
 
-from flask import jsonify
+from flask import jsonify, request
@@ -1,28 +1,145 @@
-import requests
 import os
+import threading
+import time
 
-API_KEY = os.environ.get("ALPHA_VANTAGE_API_KEY", "Q2RPRXKJ1TUZ1QXJ")
-NEWS_URL = f"https://www.alphavantage.co/query?function=NEWS_SENTIMENT&topics=finance&apikey={API_KEY}"
-
-
-def get_market_news():
-    """Fetch Market news from Alpha Vantage API"""
-    response = requests.get(NEWS_URL)
-    if response.status_code == 200:
-        news_data = response.json().get("feed", [])
-        simplified_news = [
-            {
-                "title": item.get("title"),
-                "summary": item.get("summary"),
-                "url": item.get("url"),
-                "banner_image": item.get("banner_image"),
-                "source": item.get("source"),
-            }
-            for item in news_data
-        ]
-        return simplified_news
-    else:
+from tools.cache import create_cache
+from tools.news_store import NewsStore, parse_time
+from tools.providers import get_provider
+from tools.scheduler import priority
+
+NEWS_TOPICS = [
+    t.strip() for t in os.environ.get("NEWS_TOPICS", "finance").split(",") if t.strip()
+]
+# Alpha Vantage's free tier allows 25 requests a day
+NEWS_DAILY_BUDGET = int(os.environ.get("NEWS_DAILY_BUDGET", "25"))
+NEWS_REFRESH_SECONDS = int(os.environ.get("NEWS_REFRESH_SECONDS", "3600"))
+NEWS_RETRY_SECONDS = int(os.environ.get("NEWS_RETRY_SECONDS", "900"))
+NEWS_FETCH_LIMIT = int(os.environ.get("NEWS_FETCH_LIMIT", "200"))
+NEWS_MAX_ARTICLES = int(os.environ.get("NEWS_MAX_ARTICLES", "1000"))
+NEWS_MAX_AGE_HOURS = int(os.environ.get("NEWS_MAX_AGE_HOURS", "72"))
+NEWS_PAGE_MAX = 200
+
+news_cache = create_cache("market_news", max_entries=64)
+
+
+class NewsIngester:
+    """Pulls the Alpha Vantage news feed into a NewsStore on a fixed schedule.
+
+    One NEWS_SENTIMENT call is made per topic per refresh, and the refresh
+    interval is stretched so a day of refreshes fits in the daily request
+    budget. A failed or rate-limited refresh keeps the articles already held
+    and is retried after NEWS_RETRY_SECONDS. Raw feeds go through news_cache,
+    so with a shared cache backend the workers spend one budget between them.
+    """
+
+    def __init__(
+        self,
+        store,
+        topics=NEWS_TOPICS,
+        refresh_interval=NEWS_REFRESH_SECONDS,
+        daily_budget=NEWS_DAILY_BUDGET,
+        retry_interval=NEWS_RETRY_SECONDS,
+        fetch_limit=NEWS_FETCH_LIMIT,
+    ):
+        self.store = store
+        self.topics = topics
+        self.refresh_interval = max(
+            refresh_interval, 86400 * len(topics) / max(daily_budget, 1)
+        )
+        self.retry_interval = min(retry_interval, self.refresh_interval)
+        self.fetch_limit = fetch_limit
+        self._first_load = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self.loaded = False
+        self.last_refresh = None
+        self.last_error = None
+
+    def fetch(self, topic):
+        """Raw feed for topic; errors (including rate-limit notices) are raised, not cached"""
+        response = get_provider().news(topics=topic, limit=self.fetch_limit)
+        if "feed" not in response:
+            # Rate limiting comes back as HTTP 200 with an Information/Note message
+            raise RuntimeError(
+                response.get("Information")
+                or response.get("Note")
+                or "response has no feed"
+            )
+        return response
+
+    def refresh(self):
+        """Fetch every topic once and merge the results; returns True if any fetch worked"""
+        ok = False
+        for topic in self.topics:
+            try:
+                with priority("dashboard"):
+                    response = news_cache.get_or_compute(
+                        ("feed", topic, self.fetch_limit),
+                        lambda: self.fetch(topic),
+                        self.refresh_interval * 0.9,
+                    )
+                added = self.store.ingest(response["feed"])
+                print(f"📰 Ingested {added} new articles for topic '{topic}'")
+                ok = True
+            except Exception as e:
+                print(f"Error fetching market news for topic '{topic}': {e}")
+                self.last_error = str(e)
+        if ok:
+            self.loaded = True
+            self.last_refresh = time.time()
+            self.last_error = None
+        return ok
+
+    def _run(self, ok):
+        while not self._stop.wait(self.refresh_interval if ok else self.retry_interval):
+            ok = self.refresh()
+
+    def ensure_started(self):
+        """Load synchronously on first use, then keep refreshing on a daemon thread"""
+        if self._thread is not None:
+            return
+        with self._first_load:
+            if self._thread is not None:
+                return
+            ok = self.refresh()
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, args=(ok,), name="news-ingest", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+
+    def stats(self):
+        return {
+            **self.store.stats(),
+            "last_refresh": self.last_refresh,
+            "last_error": self.last_error,
+            "refresh_interval": self.refresh_interval,
+        }
+
+
+store = NewsStore(max_articles=NEWS_MAX_ARTICLES, max_age_hours=NEWS_MAX_AGE_HOURS)
+ingester = NewsIngester(store)
+
+
+def get_market_news(
+    ticker=None, topic=None, source=None, since=None, limit=None, offset=0
+):
+    """Market news from the ingested Alpha Vantage feed, newest first"""
+    ingester.ensure_started()
+    if not ingester.loaded:
         return {"error": "Failed to fetch news"}
+    return store.query(
+        ticker=ticker,
+        topic=topic,
+        source=source,
+        since=since,
+        limit=limit,
+        offset=offset,
+    )
 
 
 def init_market_news(app):
@@ -30,8 +147,25 @@ def init_market_news(app):
 
     @app.route("/market-news")
     def market_news_endpoint():
-        """Get Market news"""
-        news = get_market_news()
+        """Get Market news, optionally filtered by ticker, topic, source and time"""
+        since = request.args.get("since")
+        try:
+            since = parse_time(since) if since else None
+            limit = request.args.get("limit", type=int)
+            offset = max(request.args.get("offset", 0, type=int), 0)
+        except ValueError:
+            return jsonify({"error": "Invalid since parameter"}), 400
+        if limit is not None:
+            limit = min(max(limit, 0), NEWS_PAGE_MAX)
+
+        news = get_market_news(
+            ticker=request.args.get("ticker"),
+            topic=request.args.get("topic"),
+            source=request.args.get("source"),
+            since=since,
+            limit=limit,
+            offset=offset,
+        )
         if "error" in news:
             return jsonify(news), 500
         return jsonify(news)
@@ -39,9 +173,11 @@ def init_market_news(app):
     @app.route("/market-news/health", methods=["GET"])
     def market_news_health():
         """Health check endpoint for the Market news tool"""
-        return jsonify({"status": "ok", "service": "market-news"})
+        return jsonify(
+            {"status": "ok", "service": "market-news", "store": ingester.stats()}
+        )
 
     print("✅ Market News tool initialized")
 
 
-from flask import jsonify
+from flask import jsonify, request
@@ -1,6 +1,14 @@
-import yfinance as yf
+import json
+import threading
+import time
 from datetime import datetime
 
+from tools.cache import create_cache
+from tools.providers import get_provider
+from tools.scheduler import priority
+
+sector_cache = create_cache("market_sector", max_entries=1)
+
 sector_etfs = {
     "All Sectors": "SPY",
     "Technology": "XLK",
@@ -32,39 +40,84 @@ sector_weights = {
 }
 
 
-def get_sector_data():
-    data = []
-
-    now = datetime.now()
-    start_of_year = datetime(now.year, 1, 1)
-
-    for sector, ticker in sector_etfs.items():
-        stock = yf.Ticker(ticker)
-
-        intraday_hist = stock.history(period="1d", interval="1m")
-
-        daily_hist = stock.history(period="2d")
-
-        ytd_hist = stock.history(start=start_of_year, end=now)
-
-        if (
-            not intraday_hist.empty
-            and not daily_hist.empty
-            and len(daily_hist) >= 2
-            and not ytd_hist.empty
-        ):
+class SectorPerformanceEngine:
+    """Serves sector performance from memory and refreshes it in the background.
+
+    The YTD opening price and daily closes for every ETF are downloaded once
+    per calendar day, retried on each refresh until every ETF has loaded.
+    Each refresh only pulls today's 1-minute bars for all twelve ETFs in one
+    batched call and recomputes the changes from those.
+    With a shared cache backend, one worker computes each refresh and the
+    others pick up its result.
+    """
+
+    def __init__(self, refresh_interval=60):
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._first_load = threading.Lock()
+        self._refreshing = False
+        self._baseline_day = None
+        self._baselines = {}
+        self._data = None
+        self._payload = None
+        self._updated_at = 0
+
+    def _load_baselines(self, today):
+        start_of_year = datetime(today.year, 1, 1)
+        with priority("background"):
+            frames = get_provider().history_many(
+                list(sector_etfs.values()), start=start_of_year, interval="1d"
+            )
+        baselines = {}
+        for ticker, ytd_hist in frames.items():
+            if ytd_hist.empty:
+                continue
+            baselines[ticker] = {
+                "ytd_start_price": float(ytd_hist["Open"].iloc[0]),
+                "closes": ytd_hist["Close"].dropna(),
+            }
+        self._baselines = baselines
+        # A partial load serves the ETFs it got; the next refresh tries again for the rest
+        if len(baselines) == len(sector_etfs):
+            self._baseline_day = today
+        else:
+            print(
+                f"Sector baselines loaded for {len(baselines)} of "
+                f"{len(sector_etfs)} ETFs; retrying on the next refresh"
+            )
 
-            current_price = intraday_hist["Close"].iloc[-1]
-            open_price = intraday_hist["Open"].iloc[0]
+    def compute(self):
+        """Recompute sector changes from today's intraday bars and the daily baseline"""
+        today = datetime.now().date()
+        if self._baseline_day != today:
+            self._load_baselines(today)
+
+        intraday = get_provider().history_many(
+            list(sector_etfs.values()), period="1d", interval="1m"
+        )
+
+        data = []
+        for sector, ticker in sector_etfs.items():
+            intraday_hist = intraday.get(ticker)
+            baseline = self._baselines.get(ticker)
+            if intraday_hist is None or intraday_hist.empty or baseline is None:
+                continue
+
+            current_price = intraday_hist["Close"].dropna().iloc[-1]
+            open_price = intraday_hist["Open"].dropna().iloc[0]
             intraday_change = round(
                 ((current_price - open_price) / open_price) * 100, 2
             )
 
-            today_close = daily_hist["Close"].iloc[-1]
-            prev_close = daily_hist["Close"].iloc[-2]
-            daily_change = round(((today_close - prev_close) / prev_close) * 100, 2)
+            session_day = intraday_hist.index[-1].date()
+            closes = baseline["closes"]
+            prior_closes = closes[closes.index.date < session_day]
+            if prior_closes.empty:
+                continue
+            prev_close = prior_closes.iloc[-1]
+            daily_change = round(((current_price - prev_close) / prev_close) * 100, 2)
 
-            ytd_start_price = ytd_hist["Open"].iloc[0]
+            ytd_start_price = baseline["ytd_start_price"]
             ytd_change = round(
                 ((current_price - ytd_start_price) / ytd_start_price) * 100, 2
             )
@@ -72,16 +125,58 @@ def get_sector_data():
             data.append(
                 {
                     "sector": sector,
-                    "change": intraday_change,
-                    "dailyChange": daily_change,
-                    "ytdChange": ytd_change,
+                    "change": float(intraday_change),
+                    "dailyChange": float(daily_change),
+                    "ytdChange": float(ytd_change),
                     "weight": sector_weights[sector],
                 }
             )
 
-    data = sorted(data, key=lambda x: x["weight"], reverse=True)
+        return sorted(data, key=lambda x: x["weight"], reverse=True)
+
+    def refresh(self):
+        try:
+            # Slightly under the interval so this worker's next refresh is not a stale hit
+            with priority("dashboard"):
+                data = sector_cache.get_or_compute(
+                    "sectors", self.compute, self.refresh_interval * 0.9
+                )
+            with self._lock:
+                self._data = data
+                self._payload = json.dumps(data)
+                self._updated_at = time.monotonic()
+        except Exception as e:
+            print(f"Error refreshing sector data: {e}")
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _start_refresh(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(
+            target=self.refresh, name="sector-refresh", daemon=True
+        ).start()
+
+    def snapshot(self):
+        """Return (data, json_payload), refreshing synchronously only on the first call"""
+        if self._payload is None:
+            with self._first_load:
+                if self._payload is None:
+                    self.refresh()
+        elif time.monotonic() - self._updated_at > self.refresh_interval:
+            self._start_refresh()
+        return self._data, self._payload
+
+
+engine = SectorPerformanceEngine()
+
 
-    return data
+def get_sector_data():
+    data, payload = engine.snapshot()
+    return data or []
 
 
 def init_market_sector(app):
@@ -90,8 +185,10 @@ def init_market_sector(app):
     @app.route("/api/sectors")
     def sectors_endpoint():
         """Get sector performance data"""
-        data = get_sector_data()
-        return jsonify(data)
+        data, payload = engine.snapshot()
+        if payload is None:
+            return jsonify([])
+        return app.response_class(payload, mimetype="application/json")
 
     @app.route("/sector-performance/health", methods=["GET"])
     def market_sector_health():
@@ -0,0 +1,275 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+
+from tools.cache import cache_stats
+
+LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+REGISTRY = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with a fixed set of label names"""
+
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield self.name, _labels(self.labelnames, key), value
+
+
+class Histogram:
+    """Cumulative-bucket histogram; observe() is one bisect and one locked update"""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        with self._lock:
+            series = {key: (list(s[0]), s[1], s[2]) for key, s in self._series.items()}
+        for key, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                yield (
+                    self.name + "_bucket",
+                    _labels(self.labelnames, key, [("le", _number(bound))]),
+                    cumulative,
+                )
+            yield self.name + "_sum", _labels(self.labelnames, key), total
+            yield self.name + "_count", _labels(self.labelnames, key), count
+
+
+class Gauge:
+    """Value read from a callback at scrape time; the callback returns a number or {labels: number}
+
+    kind="counter" exposes a callback that reads an existing running total.
+    """
+
+    def __init__(self, name, help, callback, labelnames=(), kind="gauge"):
+        self.name = name
+        self.kind = kind
+        self.help = help
+        self.callback = callback
+        self.labelnames = tuple(labelnames)
+        REGISTRY.append(self)
+
+    def samples(self):
+        try:
+            values = self.callback()
+        except Exception as e:
+            print(f"Error reading gauge {self.name}: {e}")
+            return
+        if not isinstance(values, dict):
+            values = {(): values}
+        for key, value in sorted(values.items()):
+            yield self.name, _labels(self.labelnames, key), value
+
+
+def _cache_values(field):
+    return lambda: {(name,): stats[field] for name, stats in cache_stats().items()}
+
+
+http_request_duration = Histogram(
+    "http_request_duration_seconds",
+    "Time to produce a response, by route pattern and status",
+    ["method", "route", "status"],
+)
+upstream_duration = Histogram(
+    "upstream_request_duration_seconds",
+    "Upstream calls made by the market data provider and the LLM client",
+    ["upstream", "operation"],
+)
+upstream_errors = Counter(
+    "upstream_errors_total",
+    "Upstream calls that raised",
+    ["upstream", "operation"],
+)
+http_client_duration = Histogram(
+    "http_client_request_duration_seconds",
+    "Individual outbound HTTP attempts through the shared pooled session",
+    ["host"],
+)
+http_client_errors = Counter(
+    "http_client_errors_total",
+    "Outbound HTTP attempts that failed to connect, timed out or returned 5xx",
+    ["host"],
+)
+speech_stage_duration = Histogram(
+    "speech_stage_duration_seconds",
+    "Time spent in each stage of a voice query",
+    ["stage"],
+)
+Gauge("cache_hits_total", "Cache hits", _cache_values("hits"), ["cache"], "counter")
+Gauge(
+    "cache_misses_total", "Cache misses", _cache_values("misses"), ["cache"], "counter"
+)
+Gauge(
+    "cache_evictions_total",
+    "Cache evictions",
+    _cache_values("evictions"),
+    ["cache"],
+    "counter",
+)
+Gauge("cache_entries", "Entries held per cache", _cache_values("entries"), ["cache"])
+Gauge(
+    "cache_bytes", "Estimated bytes held per cache", _cache_values("bytes"), ["cache"]
+)
+Gauge(
+    "cache_hit_ratio",
+    "Hits over lookups per cache",
+    _cache_values("hit_rate"),
+    ["cache"],
+)
+
+
+@contextmanager
+def upstream_timer(upstream, operation):
+    """Time one upstream call, counting it as an error if it raises"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        upstream_errors.inc(upstream=upstream, operation=operation)
+        raise
+    finally:
+        upstream_duration.observe(
+            time.perf_counter() - start, upstream=upstream, operation=operation
+        )
+
+
+def timed_upstream(upstream, operation=None):
+    """Decorator form of upstream_timer; operation defaults to the function name"""
+
+    def decorator(func):
+        name = operation or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with upstream_timer(upstream, name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def stage_timer(stage):
+    return speech_stage_duration.time(stage=stage)
+
+
+def render():
+    """All registered metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, labels, value in metric.samples():
+            lines.append(f"{name}{labels} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def init_metrics(app):
+    """Time every request by route pattern and serve /metrics"""
+
+    @app.before_request
+    def start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        start = g.pop("metrics_start", None)
+        if start is not None:
+            rule = request.url_rule.rule if request.url_rule else "unmatched"
+            http_request_duration.observe(
+                time.perf_counter() - start,
+                method=request.method,
+                route=rule,
+                status=response.status_code,
+            )
+        return response
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics_endpoint():
+        """Prometheus scrape endpoint"""
+        return Response(render(), mimetype="text/plain; version=0.0.4")
+
+    print("✅ Metrics initialized")
+
+
+from flask import Response, g, request
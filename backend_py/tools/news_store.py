@@ -0,0 +1,182 @@
+import threading
+from bisect import bisect_right
+from datetime import datetime, timezone
+
+AV_TIME_FORMAT = "%Y%m%dT%H%M%S"
+
+
+def parse_time(value):
+    """Parse an Alpha Vantage timestamp (20240115T143000) or ISO 8601 string as UTC"""
+    try:
+        parsed = datetime.strptime(value, AV_TIME_FORMAT)
+    except ValueError:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def normalize_topic(topic):
+    return topic.strip().lower().replace("_", " ")
+
+
+def simplify_article(item):
+    """Map an Alpha Vantage NEWS_SENTIMENT feed item to the shape /market-news serves"""
+    published = parse_time(item["time_published"])
+    return {
+        "title": item.get("title"),
+        "summary": item.get("summary"),
+        "url": item.get("url"),
+        "banner_image": item.get("banner_image"),
+        "source": item.get("source"),
+        "time_published": published.isoformat(),
+        "topics": [t["topic"] for t in item.get("topics", []) if t.get("topic")],
+        "tickers": [
+            t["ticker"] for t in item.get("ticker_sentiment", []) if t.get("ticker")
+        ],
+        "sentiment": {
+            "score": _float(item.get("overall_sentiment_score")),
+            "label": item.get("overall_sentiment_label"),
+        },
+        "ticker_sentiment": {
+            t["ticker"]: {
+                "score": _float(t.get("ticker_sentiment_score")),
+                "label": t.get("ticker_sentiment_label"),
+                "relevance": _float(t.get("relevance_score")),
+            }
+            for t in item.get("ticker_sentiment", [])
+            if t.get("ticker")
+        },
+    }
+
+
+class NewsStore:
+    """Rolling in-memory set of news articles, deduplicated by URL and indexed for filtering.
+
+    Articles are kept newest first, together with one list per ticker, topic
+    and source. A single-filter page is a slice of the matching list; with
+    several filters the shortest list is walked and checked against the
+    rest. `since` is a binary search on publish time. Each ingest rebuilds
+    the lists off to the side and swaps them in, so readers never take a
+    lock.
+    """
+
+    def __init__(self, max_articles=1000, max_age_hours=72):
+        self.max_articles = max_articles
+        self.max_age_hours = max_age_hours
+        self._lock = threading.Lock()
+        self._by_url = {}
+        self._view = ([], {}, {}, {})
+
+    def __len__(self):
+        return len(self._view[0])
+
+    def ingest(self, feed, now=None):
+        """Add or update feed items and drop the oldest ones; returns how many were new"""
+        now = now or datetime.now(timezone.utc)
+        cutoff = now.timestamp() - self.max_age_hours * 3600
+        added = 0
+        with self._lock:
+            by_url = dict(self._by_url)
+            for item in feed:
+                url = item.get("url")
+                if not url or not item.get("time_published"):
+                    continue
+                try:
+                    article = simplify_article(item)
+                except ValueError:
+                    continue
+                added += url not in by_url
+                by_url[url] = (parse_time(item["time_published"]).timestamp(), article)
+
+            ordered = sorted(
+                (entry for entry in by_url.values() if entry[0] >= cutoff),
+                key=lambda entry: entry[0],
+                reverse=True,
+            )[: self.max_articles]
+            self._by_url = {entry[1]["url"]: entry for entry in ordered}
+            self._view = self._build(ordered)
+        return added
+
+    def _build(self, ordered):
+        by_ticker, by_topic, by_source = {}, {}, {}
+        for entry in ordered:
+            article = entry[1]
+            for ticker in article["tickers"]:
+                by_ticker.setdefault(ticker.upper(), []).append(entry)
+            for topic in article["topics"]:
+                by_topic.setdefault(normalize_topic(topic), []).append(entry)
+            if article["source"]:
+                by_source.setdefault(article["source"].lower(), []).append(entry)
+        return ordered, by_ticker, by_topic, by_source
+
+    def query(
+        self, ticker=None, topic=None, source=None, since=None, limit=None, offset=0
+    ):
+        """Newest-first articles matching every given filter, paginated by offset/limit"""
+        ordered, by_ticker, by_topic, by_source = self._view
+        candidates = [ordered]
+        if ticker:
+            candidates.append(by_ticker.get(ticker.upper(), []))
+        if topic:
+            candidates.append(by_topic.get(normalize_topic(topic), []))
+        if source:
+            candidates.append(by_source.get(source.lower(), []))
+        entries = min(candidates, key=len)
+
+        if since is not None:
+            # Lists are newest first, so negate timestamps for an ascending search key
+            end = bisect_right(entries, -since.timestamp(), key=lambda e: -e[0])
+        else:
+            end = len(entries)
+
+        if sum(1 for f in (ticker, topic, source) if f) <= 1:
+            page = entries[offset:end]
+            if limit is not None:
+                page = page[:limit]
+            return [entry[1] for entry in page]
+
+        def matches(article):
+            return (
+                (
+                    not ticker
+                    or ticker.upper() in (t.upper() for t in article["tickers"])
+                )
+                and (
+                    not topic
+                    or normalize_topic(topic)
+                    in (normalize_topic(t) for t in article["topics"])
+                )
+                and (not source or (article["source"] or "").lower() == source.lower())
+            )
+
+        results = []
+        skipped = 0
+        for i in range(end):
+            article = entries[i][1]
+            if not matches(article):
+                continue
+            if skipped < offset:
+                skipped += 1
+                continue
+            results.append(article)
+            if limit is not None and len(results) >= limit:
+                break
+        return results
+
+    def stats(self):
+        ordered, by_ticker, by_topic, by_source = self._view
+        return {
+            "articles": len(ordered),
+            "tickers": len(by_ticker),
+            "topics": len(by_topic),
+            "sources": len(by_source),
+            "newest": ordered[0][1]["time_published"] if ordered else None,
+        }
@@ -0,0 +1,442 @@
+import hashlib
+import os
+import pickle
+import re
+import threading
+import time
+from datetime import date
+
+from tools import http_client
+from tools.cache import create_cache
+from tools.metrics import timed_upstream
+from tools.scheduler import scheduled
+
+ALPHA_VANTAGE_API_KEY = os.environ.get("ALPHA_VANTAGE_API_KEY", "Q2RPRXKJ1TUZ1QXJ")
+ALPHA_VANTAGE_URL = "https://www.alphavantage.co/query"
+YAHOO_SEARCH_URL = "https://query2.finance.yahoo.com/v1/finance/search"
+MARKET_CACHE_MAX_BYTES = int(os.environ.get("MARKET_CACHE_MAX_MB", "128")) * 1024 * 1024
+CACHE_TTLS = {
+    "quote": 30,
+    "recent": 60,
+    "history": 900,
+    "info": 900,
+}
+RECENT_PERIODS = {"1d", "2d", "5d"}
+# Open-ended requests starting this few days back (incremental refreshes) still change
+RECENT_START_DAYS = 7
+YAHOO_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+
+class MarketDataProvider:
+    """Interface every market-data source implements.
+
+    history() returns an OHLCV DataFrame indexed by timestamp, info() the
+    Yahoo quoteSummary-style dict, search() and news() the raw upstream JSON.
+    """
+
+    def history(self, symbol, period=None, interval="1d", start=None, end=None):
+        raise NotImplementedError
+
+    def history_many(self, symbols, period=None, interval="1d", start=None, end=None):
+        """Return {symbol: DataFrame}; symbols without data are left out"""
+        frames = {}
+        for symbol in symbols:
+            hist = self.history(
+                symbol, period=period, interval=interval, start=start, end=end
+            )
+            if not hist.empty:
+                frames[symbol] = hist
+        return frames
+
+    def quotes(self, symbols):
+        """Return {symbol: {"price", "previous_close"}} from the latest daily bars"""
+        return _quotes_from_frames(self.history_many(symbols, period="5d"))
+
+    def info(self, symbol):
+        raise NotImplementedError
+
+    def search(self, query, quotes_count=8):
+        raise NotImplementedError
+
+    def news(self, topics="finance", limit=None):
+        raise NotImplementedError
+
+
+class YFinanceProvider(MarketDataProvider):
+    """Live data from yfinance, Yahoo search and Alpha Vantage, paced by the upstream scheduler"""
+
+    @scheduled("yahoo")
+    @timed_upstream("yfinance")
+    def history(self, symbol, period=None, interval="1d", start=None, end=None):
+        import yfinance as yf
+
+        return yf.Ticker(symbol, session=http_client.session).history(
+            period=period, interval=interval, start=start, end=end
+        )
+
+    def _download(self, symbols, **kwargs):
+        import pandas as pd
+        import yfinance as yf
+
+        data = yf.download(
+            list(symbols),
+            group_by="ticker",
+            threads=True,
+            progress=False,
+            session=http_client.session,
+            **kwargs,
+        )
+        frames = {}
+        for symbol in symbols:
+            try:
+                if isinstance(data.columns, pd.MultiIndex):
+                    hist = data[symbol]
+                else:
+                    hist = data
+                hist = hist.dropna(how="all")
+            except KeyError:
+                continue
+            if not hist.empty:
+                frames[symbol] = hist
+        return frames
+
+    @scheduled("yahoo")
+    @timed_upstream("yfinance")
+    def history_many(self, symbols, period=None, interval="1d", start=None, end=None):
+        if period is None and start is None:
+            period = "1mo"
+        return self._download(
+            symbols, period=period, interval=interval, start=start, end=end
+        )
+
+    @scheduled("yahoo")
+    @timed_upstream("yfinance")
+    def quotes(self, symbols):
+        return _quotes_from_frames(
+            self._download(symbols, period="5d", interval="1d", auto_adjust=False)
+        )
+
+    @scheduled("yahoo")
+    @timed_upstream("yfinance")
+    def info(self, symbol):
+        import yfinance as yf
+
+        return yf.Ticker(symbol, session=http_client.session).info
+
+    @scheduled("yahoo")
+    @timed_upstream("yahoo_search")
+    def search(self, query, quotes_count=8):
+        response = http_client.get(
+            YAHOO_SEARCH_URL,
+            params={"q": query, "quotesCount": quotes_count, "newsCount": 0},
+            headers=YAHOO_HEADERS,
+        )
+        response.raise_for_status()
+        return response.json()
+
+    @scheduled("alphavantage")
+    @timed_upstream("alphavantage")
+    def news(self, topics="finance", limit=None):
+        params = {
+            "function": "NEWS_SENTIMENT",
+            "topics": topics,
+            "apikey": ALPHA_VANTAGE_API_KEY,
+        }
+        if limit:
+            params["limit"] = limit
+        response = http_client.get(ALPHA_VANTAGE_URL, params=params)
+        response.raise_for_status()
+        return response.json()
+
+
+class ReplayMiss(LookupError):
+    """Raised by ReplayProvider when no capture exists for a call"""
+
+
+class ReplayProvider(MarketDataProvider):
+    """Serves captured responses from a directory, or records them when given an upstream.
+
+    Captures live at <directory>/<method>/<subject>/<key>.pkl, where subject
+    is the symbol or query and key hashes the remaining arguments, with the
+    start/end dates of history calls hashed separately. Unless strict is
+    set, a history call whose dates were never captured is answered with the
+    newest capture for the same symbol, period and interval, so
+    date-relative calls (YTD ranges and the like) keep replaying on later
+    days. Every call sleeps for `latency` seconds to mimic the upstream
+    round trip.
+    """
+
+    def __init__(self, directory, upstream=None, latency=0.0, strict=False):
+        self.directory = directory
+        self.upstream = upstream
+        self.latency = latency
+        self.strict = strict
+        self._lock = threading.Lock()
+
+    def _path(self, method, subject, args, dates=None):
+        safe_subject = re.sub(r"[^A-Za-z0-9._-]", "_", str(subject)) or "_"
+        if len(safe_subject) > 80:
+            digest = hashlib.sha1(str(subject).encode("utf-8")).hexdigest()[:12]
+            safe_subject = f"{safe_subject[:60]}-{digest}"
+        key = hashlib.sha1(repr(args).encode("utf-8")).hexdigest()[:16]
+        if dates is not None:
+            key += "-" + hashlib.sha1(repr(dates).encode("utf-8")).hexdigest()[:8]
+        return os.path.join(self.directory, method, safe_subject, f"{key}.pkl")
+
+    def _call(self, method, subject, args, fetch, dates=None):
+        path = self._path(method, subject, args, dates)
+
+        if self.upstream is not None:
+            result = fetch(self.upstream)
+            with self._lock:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path + ".tmp", "wb") as f:
+                    pickle.dump(result, f)
+                os.replace(path + ".tmp", path)
+            return result
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        if dates is not None and not os.path.exists(path) and not self.strict:
+            folder, name = os.path.split(path)
+            prefix = name.rsplit("-", 1)[0] + "-"
+            captures = []
+            if os.path.isdir(folder):
+                captures = [
+                    os.path.join(folder, capture)
+                    for capture in os.listdir(folder)
+                    if capture.startswith(prefix) and capture.endswith(".pkl")
+                ]
+            if captures:
+                path = max(captures, key=os.path.getmtime)
+
+        try:
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            raise ReplayMiss(
+                f"No capture for {method}({subject!r}, {args + (dates or ())!r})"
+            )
+
+    def history(self, symbol, period=None, interval="1d", start=None, end=None):
+        return self._call(
+            "history",
+            symbol,
+            (period, interval),
+            lambda upstream: upstream.history(symbol, period, interval, start, end),
+            dates=(_day(start), _day(end)),
+        )
+
+    def history_many(self, symbols, period=None, interval="1d", start=None, end=None):
+        return self._call(
+            "history_many",
+            ",".join(symbols),
+            (period, interval),
+            lambda upstream: upstream.history_many(
+                symbols, period, interval, start, end
+            ),
+            dates=(_day(start), _day(end)),
+        )
+
+    def quotes(self, symbols):
+        return self._call(
+            "quotes", ",".join(symbols), (), lambda upstream: upstream.quotes(symbols)
+        )
+
+    def info(self, symbol):
+        return self._call("info", symbol, (), lambda upstream: upstream.info(symbol))
+
+    def search(self, query, quotes_count=8):
+        return self._call(
+            "search",
+            query,
+            (quotes_count,),
+            lambda upstream: upstream.search(query, quotes_count),
+        )
+
+    def news(self, topics="finance", limit=None):
+        return self._call(
+            "news", topics, (limit,), lambda upstream: upstream.news(topics, limit)
+        )
+
+
+class CachingProvider(MarketDataProvider):
+    """Serves quotes, history and info from the shared TTL cache in front of an upstream.
+
+    Keys are (kind, symbol, period/interval...) so the same bars fetched by
+    different tools are shared, and concurrent misses collapse into a single
+    upstream call. Batched calls only ask the upstream for the symbols that
+    are not already cached. Search and news pass straight through.
+    """
+
+    def __init__(self, upstream, cache=None, ttls=None):
+        self.upstream = upstream
+        self.cache = cache or create_cache(
+            "market_data", max_entries=4096, max_bytes=MARKET_CACHE_MAX_BYTES
+        )
+        self.ttls = dict(CACHE_TTLS, **(ttls or {}))
+
+    def _history_ttl(self, period, interval, start=None, end=None):
+        if period in RECENT_PERIODS or not interval.endswith(("d", "wk", "mo")):
+            return self.ttls["recent"]
+        if start is not None and end is None and _days_ago(start) <= RECENT_START_DAYS:
+            return self.ttls["recent"]
+        return self.ttls["history"]
+
+    def history(self, symbol, period=None, interval="1d", start=None, end=None):
+        key = ("history", symbol, period, interval, _day(start), _day(end))
+        hist = self.cache.get_or_compute(
+            key,
+            lambda: self.upstream.history(symbol, period, interval, start, end),
+            self._history_ttl(period, interval, start, end),
+        )
+        return hist.copy()
+
+    def history_many(self, symbols, period=None, interval="1d", start=None, end=None):
+        ttl = self._history_ttl(period, interval, start, end)
+        day_start, day_end = _day(start), _day(end)
+
+        frames = {}
+        missing = []
+        for symbol in symbols:
+            hist = self.cache.get(
+                ("history", symbol, period, interval, day_start, day_end)
+            )
+            if hist is None:
+                missing.append(symbol)
+            elif not hist.empty:
+                frames[symbol] = hist.copy()
+
+        if missing:
+
+            def fetch():
+                import pandas as pd
+
+                fetched = self.upstream.history_many(
+                    missing, period, interval, start, end
+                )
+                for symbol in missing:
+                    self.cache.set(
+                        ("history", symbol, period, interval, day_start, day_end),
+                        fetched.get(symbol, pd.DataFrame()),
+                        ttl,
+                    )
+                return fetched
+
+            batch_key = (
+                "history_many",
+                tuple(missing),
+                period,
+                interval,
+                day_start,
+                day_end,
+            )
+            for symbol, hist in self.cache.coalesce(batch_key, fetch).items():
+                frames[symbol] = hist.copy()
+        return frames
+
+    def quotes(self, symbols):
+        quotes = {}
+        missing = []
+        for symbol in symbols:
+            quote = self.cache.get(("quote", symbol))
+            if quote is None:
+                missing.append(symbol)
+            elif quote:
+                quotes[symbol] = dict(quote)
+
+        if missing:
+
+            def fetch():
+                fetched = self.upstream.quotes(missing)
+                for symbol in missing:
+                    self.cache.set(
+                        ("quote", symbol), fetched.get(symbol, {}), self.ttls["quote"]
+                    )
+                return fetched
+
+            for symbol, quote in self.cache.coalesce(
+                ("quotes", tuple(missing)), fetch
+            ).items():
+                quotes[symbol] = dict(quote)
+        return quotes
+
+    def info(self, symbol):
+        info = self.cache.get_or_compute(
+            ("info", symbol), lambda: self.upstream.info(symbol), self.ttls["info"]
+        )
+        return dict(info)
+
+    def search(self, query, quotes_count=8):
+        return self.upstream.search(query, quotes_count)
+
+    def news(self, topics="finance", limit=None):
+        return self.upstream.news(topics, limit)
+
+
+def _quotes_from_frames(frames):
+    quotes = {}
+    for symbol, hist in frames.items():
+        closes = hist["Close"].dropna()
+        if closes.empty:
+            continue
+        quotes[symbol] = {
+            "price": float(closes.iloc[-1]),
+            "previous_close": float(closes.iloc[-2]) if len(closes) > 1 else None,
+        }
+    return quotes
+
+
+def _day(value):
+    """Reduce datetimes to dates so captures key on the calendar day"""
+    if hasattr(value, "strftime"):
+        return value.strftime("%Y-%m-%d")
+    return value
+
+
+def _days_ago(value):
+    """Whole days between a start date and today (0 for anything unparseable)"""
+    try:
+        return (date.today() - date.fromisoformat(str(_day(value))[:10])).days
+    except ValueError:
+        return 0
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def create_provider():
+    """Build the provider selected by MARKET_DATA_PROVIDER (yfinance, record or replay)"""
+    kind = os.environ.get("MARKET_DATA_PROVIDER", "yfinance").lower()
+    directory = os.environ.get("MARKET_DATA_DIR", "recordings")
+    latency = float(os.environ.get("MARKET_DATA_LATENCY", "0"))
+    strict = os.environ.get("MARKET_DATA_STRICT", "0") == "1"
+
+    if kind == "yfinance":
+        return YFinanceProvider()
+    if kind == "record":
+        return ReplayProvider(directory, upstream=YFinanceProvider())
+    if kind == "replay":
+        return ReplayProvider(directory, latency=latency, strict=strict)
+    raise ValueError(f"Unknown MARKET_DATA_PROVIDER: {kind}")
+
+
+def get_provider():
+    """Return the process-wide market-data provider, behind the shared cache"""
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                _provider = CachingProvider(create_provider())
+    return _provider
+
+
+def set_provider(provider, cache=True):
+    """Replace the process-wide provider (benchmarks and offline runs)"""
+    global _provider
+    with _provider_lock:
+        _provider = CachingProvider(provider) if cache else provider
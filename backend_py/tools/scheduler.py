@@ -0,0 +1,203 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from tools import metrics
+
+# Lower rank is served first: a user waiting on an answer, then dashboard refreshes, then warmups
+PRIORITIES = {"interactive": 0, "dashboard": 1, "background": 2}
+# Longest a call queues before UpstreamBusy; dashboards then keep serving their last snapshot
+MAX_WAIT_SECONDS = {"interactive": 15.0, "dashboard": 5.0, "background": 60.0}
+# (requests per minute, burst) per upstream; a rate of 0 turns the limit off
+UPSTREAM_LIMITS = {
+    "yahoo": (float(os.environ.get("YAHOO_RATE_PER_MINUTE", "120")), 20),
+    "groq": (float(os.environ.get("GROQ_RATE_PER_MINUTE", "30")), 5),
+    "alphavantage": (float(os.environ.get("ALPHA_VANTAGE_RATE_PER_MINUTE", "5")), 2),
+}
+
+
+class UpstreamBusy(RuntimeError):
+    """An upstream call would have queued longer than its priority class allows"""
+
+
+_context = threading.local()
+
+
+def current_priority():
+    return getattr(_context, "priority", "interactive")
+
+
+@contextmanager
+def priority(name):
+    """Make upstream calls on this thread at the given priority class (interactive by default)"""
+    if name not in PRIORITIES:
+        raise ValueError(f"Unknown priority: {name}")
+    previous = current_priority()
+    _context.priority = name
+    try:
+        yield
+    finally:
+        _context.priority = previous
+
+
+class TokenBucket:
+    """Token bucket whose waiters are served by priority class, then in arrival order.
+
+    A caller that would not get a token within max_wait (counting the
+    callers queued ahead of it) is turned away straight away with
+    UpstreamBusy instead of sleeping until its deadline.
+    """
+
+    def __init__(self, name, rate_per_minute, burst):
+        self.name = name
+        self.rate = rate_per_minute / 60
+        self.burst = burst
+        self.tokens = float(burst)
+        self._updated = time.monotonic()
+        self._queue = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self.granted = dict.fromkeys(PRIORITIES, 0)
+        self.rejected = dict.fromkeys(PRIORITIES, 0)
+        self.wait_seconds = dict.fromkeys(PRIORITIES, 0.0)
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, priority_name, max_wait):
+        """Take one token, returning the seconds spent queued"""
+        if not self.rate:
+            return 0.0
+        start = time.monotonic()
+        deadline = start + max_wait
+        ticket = (PRIORITIES[priority_name], next(self._seq))
+        with self._cond:
+            heapq.heappush(self._queue, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    if self._queue[0] == ticket and self.tokens >= 1:
+                        self.tokens -= 1
+                        waited = now - start
+                        self.granted[priority_name] += 1
+                        self.wait_seconds[priority_name] += waited
+                        return waited
+                    ahead = sum(1 for queued in self._queue if queued < ticket)
+                    ready_at = now + max(0.0, (ahead + 1 - self.tokens) / self.rate)
+                    if ready_at > deadline:
+                        self.rejected[priority_name] += 1
+                        raise UpstreamBusy(
+                            f"{self.name} is over its rate limit; "
+                            f"{ahead} {'call' if ahead == 1 else 'calls'} queued ahead"
+                        )
+                    self._cond.wait(max(ready_at - now, 0.005))
+            finally:
+                self._queue.remove(ticket)
+                heapq.heapify(self._queue)
+                self._cond.notify_all()
+
+    def queued(self):
+        """Callers waiting per priority class"""
+        names = {rank: name for name, rank in PRIORITIES.items()}
+        with self._cond:
+            depth = dict.fromkeys(PRIORITIES, 0)
+            for rank, seq in self._queue:
+                depth[names[rank]] += 1
+            return depth
+
+    def stats(self):
+        queued = self.queued()
+        with self._cond:
+            self._refill(time.monotonic())
+            return {
+                "rate_per_minute": round(self.rate * 60, 2),
+                "burst": self.burst,
+                "tokens": round(self.tokens, 2),
+                "queued": queued,
+                "granted": dict(self.granted),
+                "rejected": dict(self.rejected),
+                "avg_wait_ms": {
+                    name: (
+                        round(self.wait_seconds[name] / count * 1000, 2)
+                        if count
+                        else 0.0
+                    )
+                    for name, count in self.granted.items()
+                },
+            }
+
+
+wait_duration = metrics.Histogram(
+    "scheduler_wait_seconds",
+    "Time upstream calls spent queued for a rate-limit token",
+    ["upstream", "priority"],
+)
+rejections = metrics.Counter(
+    "scheduler_rejected_total",
+    "Upstream calls turned away because the queue was longer than their priority allows",
+    ["upstream", "priority"],
+)
+
+
+class Scheduler:
+    """One token bucket per upstream, shared by every thread in the process"""
+
+    def __init__(self, limits=UPSTREAM_LIMITS):
+        self.buckets = {
+            name: TokenBucket(name, rate, burst)
+            for name, (rate, burst) in limits.items()
+        }
+
+    def acquire(self, upstream):
+        """Wait for the upstream's budget at the current thread's priority"""
+        bucket = self.buckets.get(upstream)
+        if bucket is None:
+            return 0.0
+        name = current_priority()
+        try:
+            waited = bucket.acquire(name, MAX_WAIT_SECONDS[name])
+        except UpstreamBusy:
+            rejections.inc(upstream=upstream, priority=name)
+            raise
+        wait_duration.observe(waited, upstream=upstream, priority=name)
+        return waited
+
+    def queue_depths(self):
+        return {
+            (upstream, name): depth
+            for upstream, bucket in self.buckets.items()
+            for name, depth in bucket.queued().items()
+        }
+
+    def stats(self):
+        return {upstream: bucket.stats() for upstream, bucket in self.buckets.items()}
+
+
+scheduler = Scheduler()
+
+metrics.Gauge(
+    "scheduler_queue_depth",
+    "Upstream calls waiting for a rate-limit token",
+    scheduler.queue_depths,
+    ["upstream", "priority"],
+)
+
+
+def scheduled(upstream):
+    """Decorator that takes a token from the upstream's bucket before each call"""
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            scheduler.acquire(upstream)
+            return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,152 @@
+import os
+import re
+import uuid
+
+from tools.cache import create_cache
+
+SESSION_IDLE_SECONDS = int(os.environ.get("SESSION_IDLE_SECONDS", "1800"))
+SESSION_MAX = int(os.environ.get("SESSION_MAX", "10000"))
+SESSION_MAX_BYTES = int(os.environ.get("SESSION_MAX_MB", "32")) * 1024 * 1024
+# Prompt tokens spent on earlier turns; older turns are folded into a short summary
+PROMPT_HISTORY_TOKENS = int(os.environ.get("PROMPT_HISTORY_TOKENS", "600"))
+SUMMARY_MAX_TOKENS = 120
+# Turns kept verbatim per session, and the characters kept of each side of a turn
+SESSION_MAX_TURNS = 12
+TURN_MAX_CHARS = 600
+
+SESSION_ID = re.compile(r"[A-Za-z0-9_-]{8,64}")
+# "it" with no referent: "is it a good time to invest", "it's too late to buy", ...
+_NOT_A_REFERENT = (
+    r"(?! (a (good|bad|great) |the (right|best|wrong) )?time\b| too (late|early)\b"
+    r"| (wise|smart|safe|possible|true|likely|better|best|ok|okay|a good idea) (to|that)\b)"
+)
+# "what about ...", "its/their <metric>", "that one"/"this stock", or "it"/"they"/"that"
+# as the subject of the question
+FOLLOW_UP = re.compile(
+    r"\b(what about|how about|(its|their) \w+"
+    r"|(that|this|those|these) (one|ones|stock|stocks|company|companies|share|shares|ticker)"
+    r"|(it's|they're)"
+    + _NOT_A_REFERENT
+    + r"|(is|was|are|were|does|did|do|has|have|had|will|can|could|would|should) (it|they|that)"
+    + _NOT_A_REFERENT
+    + r"|(it|they|that) (is|was|are|were|does|did|do|has|have|had|will|can|could|would"
+    r"|should|went|moved|dropped|fell|rose|gained|lost|closed|opened|traded|trade|trades)"
+    + _NOT_A_REFERENT
+    + r")\b"
+)
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token for English text)"""
+    return len(text) // 4 + 1
+
+
+def new_session():
+    return {"tickers": [], "summary": [], "turns": []}
+
+
+class SessionStore:
+    """Conversation state per session id, held in a bounded cache.
+
+    Saving a session restarts its idle timer. Sessions idle for longer than
+    idle_seconds expire, and the least recently used are evicted past
+    max_sessions or max_bytes. With CACHE_BACKEND=sqlite every worker sees
+    the same sessions.
+    """
+
+    def __init__(
+        self,
+        idle_seconds=SESSION_IDLE_SECONDS,
+        max_sessions=SESSION_MAX,
+        max_bytes=SESSION_MAX_BYTES,
+    ):
+        self.cache = create_cache(
+            "voice_sessions",
+            default_ttl=idle_seconds,
+            max_entries=max_sessions,
+            max_bytes=max_bytes,
+        )
+
+    def load(self, session_id=None):
+        """Return (session_id, session); unknown or expired ids start an empty session"""
+        if not isinstance(session_id, str) or not SESSION_ID.fullmatch(session_id):
+            session_id = uuid.uuid4().hex
+        return session_id, self.cache.get(session_id) or new_session()
+
+    def save(self, session_id, session):
+        self.cache.set(session_id, session)
+
+
+def resolve_tickers(query, tickers, session):
+    """(tickers, follow_up): those named in the query, else the last turn's for a follow-up"""
+    if tickers:
+        return tickers, False
+    if session["tickers"] and FOLLOW_UP.search(query.lower()):
+        return list(session["tickers"]), True
+    return [], False
+
+
+def _note(turn):
+    question = " ".join(turn["user"].split()[:16])
+    about = f" about {', '.join(turn['tickers'])}" if turn["tickers"] else ""
+    return f'asked "{question}"{about}'
+
+
+def _trim_notes(notes):
+    while notes and sum(estimate_tokens(note) for note in notes) > SUMMARY_MAX_TOKENS:
+        notes.pop(0)
+    return notes
+
+
+def record_turn(session, query, answer, tickers):
+    """Append a turn, folding the oldest into the summary past SESSION_MAX_TURNS"""
+    session["turns"].append(
+        {
+            "user": query[:TURN_MAX_CHARS],
+            "assistant": answer[:TURN_MAX_CHARS],
+            "tickers": tickers,
+        }
+    )
+    if tickers:
+        session["tickers"] = tickers
+    while len(session["turns"]) > SESSION_MAX_TURNS:
+        session["summary"].append(_note(session["turns"].pop(0)))
+    _trim_notes(session["summary"])
+
+
+def history_messages(session, budget=PROMPT_HISTORY_TOKENS):
+    """Chat messages for earlier turns, fitted to about budget tokens.
+
+    The newest turns go in verbatim. Turns that no longer fit are reduced
+    to what was asked and about which tickers, in one summary message that
+    is itself capped at SUMMARY_MAX_TOKENS. The prompt therefore stops
+    growing after a few turns however long the conversation gets.
+    """
+    kept = []
+    used = 0
+    for turn in reversed(session["turns"]):
+        cost = estimate_tokens(turn["user"]) + estimate_tokens(turn["assistant"])
+        if used + cost > budget:
+            break
+        kept.append(turn)
+        used += cost
+    dropped = session["turns"][: len(session["turns"]) - len(kept)]
+    notes = _trim_notes(session["summary"] + [_note(turn) for turn in dropped])
+
+    messages = []
+    if notes:
+        messages.append(
+            {
+                "role": "system",
+                "content": "Earlier in this conversation the user "
+                + "; ".join(notes)
+                + ".",
+            }
+        )
+    for turn in reversed(kept):
+        messages.append({"role": "user", "content": turn["user"]})
+        messages.append({"role": "assistant", "content": turn["assistant"]})
+    return messages
+
+
+session_store = SessionStore()
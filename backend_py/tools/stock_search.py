@@ -1,106 +1,135 @@
 from flask import request, jsonify
-import yfinance as yf
-import requests
-from bs4 import BeautifulSoup
-import json
-import time
-import concurrent.futures
 
+from tools import metrics
+from tools.cache import create_cache
+from tools.providers import get_provider
+
+QUOTES_COUNT = 8
+SEARCH_CACHE_TTL = 300
+# A truncated prefix result set is only reused when filtering still leaves this many hits
+PREFIX_MIN_RESULTS = 3
+
+search_cache = create_cache(
+    "stock_search", default_ttl=SEARCH_CACHE_TTL, max_entries=4096
+)
+prefix_hits = metrics.Counter(
+    "stock_search_prefix_hits_total",
+    "Searches answered by filtering the cached results of a shorter query",
+)
+
+
+def get_prices(symbols):
+    """Last price and change versus previous close for all symbols in one batched quote call"""
+    prices = {}
+    if not symbols:
+        return prices
+    try:
+        quotes = get_provider().quotes(list(symbols))
+    except Exception as e:
+        print(f"Error getting prices for {', '.join(symbols)}: {e}")
+        return prices
+
+    for symbol, quote in quotes.items():
+        price = quote["price"]
+        prev_close = quote["previous_close"]
+        change_percent = ((price - prev_close) / prev_close) * 100 if prev_close else 0
+        prices[symbol] = {
+            "price": round(float(price), 2),
+            "change": round(float(change_percent), 2),
+        }
+    return prices
+
+
+def with_prices(results):
+    prices = get_prices([stock["symbol"] for stock in results])
+    return [dict(stock, **prices.get(stock["symbol"], {})) for stock in results]
+
+
+def fetch_search_results(query):
+    """Query Yahoo search for equity matches (symbol, name, exchange; no prices)"""
+    data = get_provider().search(query, quotes_count=QUOTES_COUNT)
+    quotes = data.get("quotes", [])
+
+    results = []
+    for quote in quotes:
+
+        if quote.get("quoteType") == "EQUITY":
+            symbol = quote.get("symbol")
+            results.append(
+                {
+                    "symbol": symbol,
+                    "name": quote.get("shortname") or quote.get("longname") or symbol,
+                    "exchange": quote.get("exchange") or "Unknown",
+                }
+            )
+
+    return {"results": results, "complete": len(quotes) < QUOTES_COUNT}
+
+
+def _matches(stock, query):
+    if stock["symbol"].lower().startswith(query):
+        return True
+    name = stock["name"].lower()
+    return name.startswith(query) or any(
+        word.startswith(query) for word in name.split()
+    )
+
+
+def search_from_prefix(query):
+    """Answer query by filtering the cached results of its longest cached prefix.
+
+    If Yahoo returned fewer than QUOTES_COUNT matches for the prefix the set
+    was complete and filtering it is exact; otherwise the filtered list is
+    only used when it still has PREFIX_MIN_RESULTS entries.
+    """
+    for length in range(len(query) - 1, 0, -1):
+        entry = search_cache.peek(query[:length])
+        if entry is None:
+            continue
+        results = [stock for stock in entry["results"] if _matches(stock, query)]
+        if entry["complete"] or len(results) >= PREFIX_MIN_RESULTS:
+            prefix_hits.inc()
+            return results
+        return None
+    return None
+
+
+def search(query):
+    """Search results for query from the cache, a cached prefix or the upstream"""
+    cache_key = " ".join(query.lower().split())
+    if search_cache.peek(cache_key) is None:
+        results = search_from_prefix(cache_key)
+        if results is not None:
+            return results
+
+    entry = search_cache.get_or_compute(cache_key, lambda: fetch_search_results(query))
+    return entry["results"]
 
-def init_stock_search(app):
 
-    search_cache = {}
-    cache_expiry = 300  
+def init_stock_search(app):
 
     @app.route("/api/search/stocks", methods=["GET"])
     def search_stocks():
         query = request.args.get("query", "")
+        include_prices = request.args.get("prices", "true").lower() != "false"
 
-        if not query or len(query) < 1:
+        if not query or len(query.strip()) < 1:
             return jsonify([])
 
-        # Check cache first
-        cache_key = query.lower()
-        current_time = time.time()
-        if cache_key in search_cache and (
-            current_time - search_cache[cache_key]["timestamp"] < cache_expiry
-        ):
-            return jsonify(search_cache[cache_key]["results"])
-
         try:
-
-            url = f"https://query2.finance.yahoo.com/v1/finance/search?q={query}&quotesCount=8&newsCount=0"
-
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-            }
-
-            response = requests.get(url, headers=headers)
-
-            if response.status_code != 200:
-                return jsonify([]), 500
-
-            data = response.json()
-
-            equity_symbols = []
-            results = []
-
-            for quote in data.get("quotes", []):
-
-                if quote.get("quoteType") == "EQUITY":
-                    symbol = quote.get("symbol")
-                    equity_symbols.append(
-                        {
-                            "symbol": symbol,
-                            "name": quote.get("shortname")
-                            or quote.get("longname")
-                            or symbol,
-                            "exchange": quote.get("exchange") or "Unknown",
-                        }
-                    )
-
-            def get_price_data(stock_info):
-                symbol = stock_info["symbol"]
-                try:
-
-                    ticker = yf.Ticker(symbol)
-
-                    history = ticker.history(period="1d", interval="1m")
-
-                    if not history.empty:
-                        latest_price = history["Close"].iloc[-1]
-
-                        if len(history) > 1:
-                            open_price = history["Open"].iloc[0]
-                            change_percent = (
-                                (latest_price - open_price) / open_price
-                            ) * 100
-                        else:
-
-                            daily = ticker.history(period="2d")
-                            if len(daily) > 1:
-                                prev_close = daily["Close"].iloc[-2]
-                                change_percent = (
-                                    (latest_price - prev_close) / prev_close
-                                ) * 100
-                            else:
-                                change_percent = 0
-
-                        stock_info["price"] = round(float(latest_price), 2)
-                        stock_info["change"] = round(float(change_percent), 2)
-
-                    return stock_info
-                except Exception as e:
-                    print(f"Error getting price for {symbol}: {e}")
-                    return stock_info
-
-            with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-                results = list(executor.map(get_price_data, equity_symbols))
-
-            search_cache[cache_key] = {"timestamp": current_time, "results": results}
-
+            results = search(query)
+            if include_prices:
+                results = with_prices(results)
             return jsonify(results)
 
         except Exception as e:
             print(f"Error in stock search: {e}")
             return jsonify([]), 500
+
+    @app.route("/api/search/prices", methods=["GET"])
+    def search_prices():
+        """Prices for symbols already shown from a prices=false search"""
+        symbols = []
+        for value in request.args.getlist("symbols"):
+            symbols.extend(s.strip() for s in value.split(",") if s.strip())
+        return jsonify(get_prices(list(dict.fromkeys(symbols))[: QUOTES_COUNT * 4]))
@@ -0,0 +1,150 @@
+import json
+import os
+import re
+import threading
+from collections import deque
+
+SYMBOL_DIRECTORY = os.environ.get(
+    "SYMBOL_DIRECTORY", os.path.join(os.path.dirname(__file__), "symbols.json")
+)
+
+# Uppercase words that show up in speech transcripts but are not tickers
+STOP_WORDS = set("""
+    A AI AM AN AND API ARE AS AT ATH BE BUY BY CAGR CEO CFO COO CPI CTO DO EBIT
+    EPS ETF EU EV FAQ FED FOR FY GDP GO HE HOW I IF IN INR IPO IS IT ITS LLC ME
+    MY NO NOT NOW OF OK ON OR P PE PM QOQ ROE ROI SEC SELL SO THE TO TTM TV UK
+    UP US USA USD VS WE WHAT WHO WHY YOY YTD
+    ADR AGM AML APR APY AUM BOE BOJ BPS BSE DCF DII ECB EMI ESG ETN FCF FDI FII
+    FOMC FPI FX GAAP GST HNI IFRS IMF IRA KYC LTV MOM NAV NBFC NFP NSE NYSE OTC
+    PMI PPI QE RBI REIT ROA ROCE SEBI SIP SPAC VAT WACC
+    """.split())
+
+TICKER_TOKEN = re.compile(
+    r"(?<![\w^.])\^?[A-Z][A-Z0-9&]{0,11}(?:[.\-=][A-Z]{1,3})?(?![\w])"
+)
+UNKNOWN_TICKER = re.compile(r"[A-Z]{2,5}")
+
+
+class TickerIndex:
+    """Resolves company names, aliases and ticker symbols in free text without network calls.
+
+    Names are matched case-insensitively in one pass with an Aho-Corasick
+    automaton, keeping the longest match at each position and requiring word
+    boundaries on both sides. Uppercase tokens are then resolved against the
+    directory's symbols (with or without their exchange suffix), and unknown
+    2-5 letter tokens outside STOP_WORDS are kept as candidate tickers.
+    Single capital letters are ignored; those companies resolve by name.
+    """
+
+    def __init__(self, directory):
+        self.symbols = {}
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+
+        for symbol, names in directory.items():
+            self.symbols.setdefault(symbol.upper(), symbol)
+            base, sep, suffix = symbol.partition(".")
+            if sep:
+                self.symbols.setdefault(base.upper(), symbol)
+            for name in names:
+                self._add(name.lower(), symbol)
+        self._build()
+
+    def _add(self, pattern, symbol):
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append((len(pattern), symbol))
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                if self._fail[next_state] == next_state:
+                    self._fail[next_state] = 0
+                self._output[next_state] = (
+                    self._output[next_state] + self._output[self._fail[next_state]]
+                )
+
+    def _name_matches(self, text):
+        lowered = "".join(c.lower() if len(c.lower()) == 1 else c for c in text)
+        matches = []
+        state = 0
+        for end, char in enumerate(lowered, 1):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for length, symbol in self._output[state]:
+                start = end - length
+                if start > 0 and lowered[start - 1].isalnum():
+                    continue
+                if end < len(lowered) and lowered[end].isalnum():
+                    continue
+                matches.append((start, end, symbol))
+        return matches
+
+    def knows(self, symbol):
+        """Whether symbol is in the directory, rather than an unknown token kept as a candidate"""
+        return symbol.upper() in self.symbols
+
+    def find(self, text):
+        """Return every ticker mentioned in text, in order of first mention"""
+        candidates = self._name_matches(text)
+        for match in TICKER_TOKEN.finditer(text):
+            token = match.group(0)
+            if len(token) == 1:
+                continue
+            symbol = self.symbols.get(token)
+            if symbol is None:
+                if token in STOP_WORDS or not UNKNOWN_TICKER.fullmatch(token):
+                    continue
+                symbol = token
+            candidates.append((match.start(), match.end(), symbol))
+
+        candidates.sort(key=lambda m: (m[0], -(m[1] - m[0])))
+        tickers = []
+        covered_until = 0
+        for start, end, symbol in candidates:
+            if start < covered_until:
+                continue
+            covered_until = end
+            if symbol not in tickers:
+                tickers.append(symbol)
+        return tickers
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def load_ticker_index(path=SYMBOL_DIRECTORY):
+    with open(path, encoding="utf-8") as f:
+        return TickerIndex(json.load(f))
+
+
+def get_ticker_index():
+    """Return the process-wide ticker index, loading the symbol directory once"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = load_ticker_index()
+    return _index
+
+
+def find_tickers(text):
+    return get_ticker_index().find(text)
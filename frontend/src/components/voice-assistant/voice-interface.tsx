@@ -25,6 +25,7 @@ export function VoiceInterface() {
   const [isProcessing, setIsProcessing] = useState(false);
   const [error, setError] = useState<string | null>(null);
   const [inputText, setInputText] = useState("");
+  const sessionIdRef = useRef<string | null>(null);
   const scrollAreaRef = useRef<HTMLDivElement>(null);
   const messagesEndRef = useRef<HTMLDivElement>(null);
 
@@ -64,7 +65,7 @@ export function VoiceInterface() {
         headers: {
           "Content-Type": "application/json",
         },
-        body: JSON.stringify({ text }),
+        body: JSON.stringify({ text, session_id: sessionIdRef.current }),
       });
 
       if (!response.ok) {
@@ -72,6 +73,7 @@ export function VoiceInterface() {
       }
 
       const data = await response.json();
+      sessionIdRef.current = data.session_id ?? sessionIdRef.current;
 
       const assistantMessage: Message = {
         id: (Date.now() + 1).toString(),